@@ -1,2 +1,3 @@
 FIELD_ID_FORMAT = "{app_label}${model_name}[{pk}]"
+CONTENT_TYPE_ID_FORMAT = "{content_type_id}:{pk}"
 GENERIC_FIELD_NAME = "{field_name}_gfk"
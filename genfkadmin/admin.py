@@ -1,14 +1,75 @@
 import copy
-from functools import partial
+import operator
+import threading
+from collections import OrderedDict
+from functools import partial, reduce
+from types import MappingProxyType
 from typing import Callable
 
-from django.contrib import admin
-from django.contrib.contenttypes.fields import GenericForeignKey
-from django.core.exceptions import ImproperlyConfigured
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.utils import (
+    flatten_fieldsets,
+    model_ngettext,
+    quote,
+)
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.db.models import (
+    Case,
+    CharField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    When,
+)
+from django.db.models.functions import Cast
 from django.forms import ModelForm
+from django.template.response import TemplateResponse
+from django.urls import NoReverseMatch, path, reverse
+from django.utils.html import format_html
 
-from genfkadmin import GENERIC_FIELD_NAME
-from genfkadmin.forms import GenericFKModelForm
+from genfkadmin import FIELD_ID_FORMAT, GENERIC_FIELD_NAME
+
+try:
+    from django.contrib.contenttypes.prefetch import GenericPrefetch
+except ImportError:  # drop when drop django 4.2
+    GenericPrefetch = None
+from genfkadmin.cache import GenericChoicesCache, watch_model
+from genfkadmin.filters import GenericContentTypeListFilter
+from genfkadmin.forms import GenericFKModelForm, GenericFKReassignForm
+from genfkadmin.registry import registry
+from genfkadmin.targets import get_generic_targets
+from genfkadmin.views import GenericFKAutocompleteJsonView, GenericFKChangeList
+from genfkadmin.widgets import GenericFKAutocompleteSelect
+
+
+def get_pk_subquery(queryset, fk_field):
+    """
+    Return the primary keys of the queryset to compare with the object id
+    field of a GenericForeignKey, cast if the object id is stored as text.
+    """
+    queryset = queryset.order_by()
+    if isinstance(fk_field, (CharField, TextField)) and not isinstance(
+        queryset.model._meta.pk, (CharField, TextField)
+    ):
+        return queryset.values(_gfk_pk=Cast("pk", output_field=fk_field))
+    return queryset.values("pk")
+
+
+def freeze_layout(layout):
+    """
+    Return a copy of the fields or fieldsets layout made of tuples and
+    read only mappings, so it can be shared between requests.
+    """
+    if isinstance(layout, (list, tuple)):
+        return tuple(freeze_layout(item) for item in layout)
+    if isinstance(layout, dict):
+        return MappingProxyType(
+            {key: freeze_layout(value) for key, value in layout.items()}
+        )
+    return layout
 
 
 class GenericFKAdmin(admin.ModelAdmin):
@@ -17,57 +78,505 @@ class GenericFKAdmin(admin.ModelAdmin):
     """
 
     filter_callback: Callable = None
+    generic_autocomplete_fields = ()
+    generic_list_filter = ()
+    generic_search_fields = ()
+    generic_prefetch_fields = ()
+    generic_targets = {}
+    generic_choices_union = False
+    generic_choices_cache = None
+    generic_choices_cache_timeout = DEFAULT_TIMEOUT
+    generic_value_format = FIELD_ID_FORMAT
+    form_cache_size = 0
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # store a mapping of our GenericForeignKeys to their content_type and
-        # foreign_key fields
-        self.generic_fields = {}
-        self.generic_related_fields = set()
-        for field in self.model._meta.private_fields:
-            if isinstance(field, GenericForeignKey):
-                self.generic_fields[
-                    GENERIC_FIELD_NAME.format(field_name=field.name)
-                ] = {
-                    "ct_field": field.ct_field,
-                    "fk_field": field.fk_field,
-                }
-                self.generic_related_fields.add(field.ct_field)
-                self.generic_related_fields.add(field.fk_field)
+        # the fields and fieldsets with the generic fields swapped in
+        self.__layouts = {}
+
+        # the form classes built by get_form, most recently used last
+        self.form_cache = OrderedDict()
+        self.form_cache_lock = threading.Lock()
+
+        # the mapping of our GenericForeignKeys to their content_type and
+        # foreign_key fields, precomputed by the registry
+        metadata = registry.get(self.model)
+        self.generic_fields = metadata.generic_fields
+        self.generic_related_fields = metadata.generic_related_fields
+
+        # the configured GenericTargets for every model related through a
+        # GenericRelation
+        self.targets = get_generic_targets(
+            self.model,
+            self.generic_targets,
+            value_format=self.generic_value_format,
+        )
+        if self.generic_choices_cache:
+            for target in self.targets:
+                watch_model(
+                    target.model,
+                    self.generic_choices_cache,
+                    related_models=target.get_related_models(),
+                )
+
+        # the generic fields are shown through these when they're read only,
+        # e.g. for users that may only view
+        for generic_field_name in self.generic_fields:
+            if not hasattr(self, generic_field_name):
+                setattr(
+                    self,
+                    generic_field_name,
+                    self.get_generic_field_display(generic_field_name),
+                )
+
+        for option in (
+            "generic_autocomplete_fields",
+            "generic_list_filter",
+            "generic_search_fields",
+            "generic_prefetch_fields",
+        ):
+            for field_name in getattr(self, option):
+                if (
+                    GENERIC_FIELD_NAME.format(field_name=field_name)
+                    not in self.generic_fields
+                ):
+                    raise ImproperlyConfigured(
+                        f"{field_name} in {option} is not a"
+                        f" GenericForeignKey on {self.model.__name__}"
+                    )
+
+    def get_urls(self):
+        """
+        Overrides get_urls to add the autocomplete view for the generic
+        fields.
+        """
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path(
+                "generic-autocomplete/<str:field_name>/",
+                self.admin_site.admin_view(self.generic_autocomplete_view),
+                name="%s_%s_generic_autocomplete" % info,
+            ),
+            *super().get_urls(),
+        ]
+
+    def generic_autocomplete_view(self, request, field_name):
+        return GenericFKAutocompleteJsonView.as_view(admin=self)(
+            request, field_name=field_name
+        )
+
+    def get_generic_field_display(self, generic_field_name):
+        """
+        Return a callable displaying the current target of the generic field
+        for obj, used when the field is read only. It's sortable when the
+        label of any of the targets can be built in SQL.
+        """
+        ordering = None
+        if any(
+            target.get_label_expression() is not None
+            for target in self.targets
+        ):
+            ordering = generic_field_name
+        return admin.display(
+            description=self.generic_fields[generic_field_name]["label"],
+            ordering=ordering,
+        )(partial(self.display_generic_field, field_name=generic_field_name))
+
+    def get_generic_label_expression(self, generic_field_name):
+        """
+        Return a database expression of the label of each row's target for
+        the generic field, used to sort the changelist by it. The label of
+        each target model is read in a subquery on the target's primary key,
+        picked by the row's content type, so the rows are sorted in the
+        database. Targets whose label can't be built in SQL, i.e. without
+        label_fields, are sorted as NULL. Returns None if there are none.
+        """
+        generic_field = self.generic_fields[generic_field_name]
+        fk_field = self.opts.get_field(generic_field["fk_field"])
+        content_type_ids = registry.get(self.model).content_type_ids
+        whens = []
+        for target in self.targets:
+            label_expression = target.get_label_expression()
+            if label_expression is None:
+                continue
+            pk_field = target.model._meta.pk
+            object_id = OuterRef(fk_field.attname)
+            if isinstance(fk_field, (CharField, TextField)) and not isinstance(
+                pk_field, (CharField, TextField)
+            ):
+                object_id = Cast(object_id, output_field=pk_field)
+            whens.append(
+                When(
+                    **{
+                        generic_field["ct_attname"]: content_type_ids[
+                            target.model
+                        ]
+                    },
+                    then=Subquery(
+                        target.model._default_manager.filter(pk=object_id)
+                        .order_by()
+                        .values(_gfk_label=label_expression)[:1]
+                    ),
+                )
+            )
+        if not whens:
+            return None
+        return Case(*whens, output_field=CharField())
+
+    def display_generic_field(self, obj, field_name):
+        """
+        Display the current target of the generic field, linked to its
+        change page if its model is registered. Only the target itself is
+        fetched, none of the candidates are.
+        """
+        target_instance = getattr(
+            obj, self.generic_fields[field_name]["original_field_name"]
+        )
+        if target_instance is None:
+            return self.get_empty_value_display()
+        opts = target_instance._meta
+        try:
+            url = reverse(
+                "%s:%s_%s_change"
+                % (self.admin_site.name, opts.app_label, opts.model_name),
+                args=[quote(target_instance.pk)],
+            )
+        except NoReverseMatch:
+            return str(target_instance)
+        return format_html('<a href="{}">{}</a>', url, target_instance)
+
+    @admin.action(
+        description="Reassign the generic target of selected"
+        " %(verbose_name_plural)s",
+        permissions=["change"],
+    )
+    def reassign_generic_target(self, request, queryset):
+        """
+        An action pointing a GenericForeignKey of the selected rows at a new
+        target, picked on an intermediate page. The target is validated once
+        and the rows are updated with a single UPDATE of their content type
+        and object id columns, so the instances aren't loaded or saved, and
+        neither save() nor the model's signals are run. Add it to actions to
+        use it.
+        """
+        form = self.get_reassign_form(
+            request, data=request.POST if "post" in request.POST else None
+        )
+        if form.is_bound and form.is_valid():
+            count = queryset.update(**form.get_update_kwargs())
+            self.message_user(
+                request,
+                f"Successfully reassigned {count}"
+                f" {model_ngettext(self.opts, count)}.",
+                messages.SUCCESS,
+            )
+            # return None to display the change list page again
+            return None
+
+        count = queryset.count()
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Reassign generic target",
+            "subtitle": None,
+            "opts": self.opts,
+            "form": form,
+            "media": self.media + form.media,
+            "count": count,
+            "objects_name": model_ngettext(self.opts, count),
+            "action": request.POST.get("action", "reassign_generic_target"),
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(
+            request,
+            [
+                "admin/%s/%s/reassign_generic_target.html"
+                % (self.opts.app_label, self.opts.model_name),
+                "admin/%s/reassign_generic_target.html" % self.opts.app_label,
+                "admin/genfkadmin/reassign_generic_target.html",
+            ],
+            context,
+        )
+
+    def get_reassign_form(self, request, data=None):
+        """
+        Return the form of the reassign_generic_target action. Its target is
+        picked from this admin's targets, with the filter_callback and
+        choices cache of the add form, and uses the autocomplete widget if
+        any generic field does.
+        """
+        field_options = {
+            "filter_callback": self.get_filter_callback(),
+            "targets": self.targets,
+            "union": self.generic_choices_union,
+            "choices_cache": self.get_choices_cache(request),
+        }
+        generic_widgets = self.get_generic_widgets()
+        if generic_widgets:
+            # every generic field searches the same targets, so any of the
+            # autocomplete views will do
+            field_options["widget"] = next(iter(generic_widgets.values()))
+        return GenericFKReassignForm(
+            data, model=self.model, field_options=field_options
+        )
+
+    def get_changelist(self, request, **kwargs):
+        return GenericFKChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Overrides get_search_results to also match the rows whose generic
+        targets, for the GenericForeignKeys in generic_search_fields, match
+        the search term.
+        """
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        generic_filter = self.get_generic_search_filter(request, search_term)
+        if generic_filter is None:
+            return results, may_have_duplicates
+        if self.get_search_fields(request):
+            return results | queryset.filter(
+                generic_filter
+            ), may_have_duplicates
+        return queryset.filter(generic_filter), may_have_duplicates
+
+    def get_generic_search_filter(self, request, search_term):
+        """
+        Return a filter matching the rows whose generic targets match the
+        search term, or None if there's nothing to search. Each target model
+        is searched in a subquery of its matching primary keys, so the rows
+        are found through the (content_type, object_id) index rather than by
+        joining or loading the targets.
+        """
+        if not search_term:
+            return None
+        content_type_ids = registry.get(self.model).content_type_ids
+        filters = []
+        for field_name in self.generic_search_fields:
+            generic_field = self.generic_fields[
+                GENERIC_FIELD_NAME.format(field_name=field_name)
+            ]
+            fk_field = self.opts.get_field(generic_field["fk_field"])
+            for target in self.targets:
+                matches = self.get_target_search_results(
+                    request,
+                    target,
+                    target.model._default_manager.all(),
+                    search_term,
+                )
+                if matches is None:
+                    continue
+                filters.append(
+                    Q(
+                        **{
+                            generic_field["ct_attname"]: content_type_ids[
+                                target.model
+                            ],
+                            f"{fk_field.attname}__in": get_pk_subquery(
+                                matches, fk_field
+                            ),
+                        }
+                    )
+                )
+        if not filters:
+            return None
+        return reduce(operator.or_, filters)
+
+    def get_target_search_results(
+        self, request, target, queryset, search_term
+    ):
+        """
+        Search the candidates of a target with its declared search_fields,
+        falling back to the search fields of the target model's registered
+        ModelAdmin. Returns None if the target can't be searched.
+        """
+        if target.search_fields:
+            return target.search(queryset, search_term)
+
+        target_admin = self.admin_site._registry.get(target.model)
+        if target_admin is None or not target_admin.get_search_fields(request):
+            return None
+        queryset, may_have_duplicates = target_admin.get_search_results(
+            request, queryset, search_term
+        )
+        if may_have_duplicates:
+            queryset = queryset.distinct()
+        return queryset
+
+    def get_list_filter(self, request):
+        """
+        Add a GenericContentTypeListFilter for each of the GenericForeignKeys
+        listed in generic_list_filter.
+        """
+        return (
+            *super().get_list_filter(request),
+            *(
+                (
+                    self.generic_fields[
+                        GENERIC_FIELD_NAME.format(field_name=field_name)
+                    ]["ct_field"],
+                    GenericContentTypeListFilter,
+                )
+                for field_name in self.generic_list_filter
+            ),
+        )
+
+    def get_generic_prefetches(self, request):
+        """
+        Return the prefetches that resolve the target of each
+        GenericForeignKey displayed on the changelist, i.e. whose generated
+        field is in list_display or that's listed in generic_prefetch_fields.
+        The target models are queried with the select_related,
+        prefetch_related and only hints of their GenericTarget.
+        """
+        list_display = self.get_list_display(request)
+        prefetches = []
+        for generic_field_name, generic_field in self.generic_fields.items():
+            if (
+                generic_field_name not in list_display
+                and generic_field["original_field_name"]
+                not in self.generic_prefetch_fields
+            ):
+                continue
+            if GenericPrefetch is None:  # drop when drop django 4.2
+                prefetches.append(generic_field["original_field_name"])
+                continue
+            prefetches.append(
+                GenericPrefetch(
+                    generic_field["original_field_name"],
+                    [
+                        target.apply_hints(target.model._default_manager.all())
+                        for target in self.targets
+                    ],
+                )
+            )
+        return prefetches
+
+    def get_filter_callback(self, obj=None):
+        """
+        Return the filter_callback bound to the given obj, if there is one.
+        """
+        if not self.filter_callback:
+            return None
+        return (
+            partial(self.filter_callback, **{"obj": obj})
+            if obj
+            else self.filter_callback
+        )
+
+    def get_choices_cache_key(self, request, obj=None):
+        """
+        Return the key identifying the choices built for this admin. With a
+        filter_callback, the key includes the SQL of each target's filtered
+        queryset, which is built without querying, so the key changes with
+        whatever the filter selects, e.g. a field of obj that was changed.
+        Override this if the choices depend on anything the SQL doesn't
+        show.
+        """
+        key = [self.admin_site.name, self.opts.label_lower]
+        if self.filter_callback:
+            filter_callback = self.get_filter_callback(obj)
+            for target in self.targets:
+                queryset = target.get_queryset(filter_callback=filter_callback)
+                try:
+                    key.append(queryset.query.sql_with_params())
+                except EmptyResultSet:
+                    # the filter matches nothing
+                    key.append(None)
+        return tuple(key)
+
+    def get_choices_cache(self, request, obj=None):
+        """
+        Return the GenericChoicesCache for the generic fields if
+        generic_choices_cache names a cache to use.
+        """
+        if not self.generic_choices_cache:
+            return None
+        return GenericChoicesCache(
+            self.get_choices_cache_key(request, obj),
+            alias=self.generic_choices_cache,
+            timeout=self.generic_choices_cache_timeout,
+        )
+
+    def get_generic_widgets(self):
+        """
+        Return the widgets to use for the generic fields listed in
+        generic_autocomplete_fields.
+        """
+        info = self.opts.app_label, self.opts.model_name
+        widgets = {}
+        for field_name in self.generic_autocomplete_fields:
+            generic_field_name = GENERIC_FIELD_NAME.format(
+                field_name=field_name
+            )
+            widgets[generic_field_name] = GenericFKAutocompleteSelect(
+                url=reverse(
+                    "%s:%s_%s_generic_autocomplete"
+                    % (self.admin_site.name, *info),
+                    kwargs={"field_name": generic_field_name},
+                ),
+            )
+        return widgets
 
     def get_fields(self, *args, **kwargs):
         """
         Overrides get_fields to remove content_type and foreign_key fields for
-        the GenericForeignKey and replaces them with the dynamic fields.
+        the GenericForeignKey and replaces them with the dynamic fields. The
+        result is computed once, and again only if fields is changed.
         """
         if self.fields:
-            return self.__handle_fields(copy.deepcopy(self.fields))
+            return self.__get_layout("fields", self.__handle_fields)
         else:
             if self.form and issubclass(self.form, GenericFKModelForm):
                 # respect the GenericFKModelForm fields
                 # there isn't a great way to maintain order here
-                return [
+                return (
                     *self.form.base_fields,
                     *self.get_readonly_fields(args[0], kwargs.get("obj")),
-                ]
-            return self.__handle_auto_gen()
+                )
+            return self.__get_layout(
+                "model", lambda model: self.__handle_auto_gen()
+            )
 
     def get_fieldsets(self, *args, **kwargs):
         """
         Overrides get_fieldsets to remove content_type and foreign_key fields
         for the GenericForeignKey and replaces them with the dynamic fields
-        anywhere in the fieldsets declaration if it exists
+        anywhere in the fieldsets declaration if it exists. The result is
+        computed once, and again only if fieldsets is changed.
         """
         if self.fieldsets:
-            updated_fieldsets = copy.deepcopy(self.fieldsets)
-            for fieldset_name, fieldset in updated_fieldsets:
-                fieldset["fields"] = self.__handle_fields(
-                    copy.deepcopy(fieldset["fields"])
-                )
-            return updated_fieldsets
+            return self.__get_layout(
+                "fieldsets",
+                lambda fieldsets: [
+                    (
+                        fieldset_name,
+                        {
+                            **fieldset,
+                            "fields": self.__handle_fields(fieldset["fields"]),
+                        },
+                    )
+                    for fieldset_name, fieldset in fieldsets
+                ],
+            )
         else:
-            return [(None, {"fields": self.get_fields(*args, **kwargs)})]
+            return ((None, {"fields": self.get_fields(*args, **kwargs)}),)
+
+    def __get_layout(self, attr, build):
+        # build the layout from the declared attr and keep it, along with a
+        # copy of what it was built from, until the declaration changes
+        declared = getattr(self, attr)
+        layout = self.__layouts.get(attr)
+        if layout is None or layout[0] != declared:
+            layout = self.__layouts[attr] = (
+                copy.deepcopy(declared),
+                freeze_layout(build(declared)),
+            )
+        return layout[1]
 
     def __handle_fields(self, fields_to_update):
         origin_type = type(fields_to_update)
@@ -167,30 +676,107 @@ class GenericFKAdmin(admin.ModelAdmin):
             updated_fields_with_generic_keys.insert(new_idx, generic_field)
         return updated_fields_with_generic_keys
 
-    def get_form(self, request, obj=None, change=False, **kwargs):
+    def get_form_class(self):
         """
-        Overrides get_form to ensure GenericFKModelForm is used instead of
-        the default ModelForm. If we have a callback, supply it for the form
-        so it can be used in the metaclass.
+        Return the form class to build the admin's form from, ensuring
+        GenericFKModelForm is used instead of the default ModelForm.
         """
-
         if not self.form or self.form == ModelForm:
-            kwargs["form"] = GenericFKModelForm
-        elif self.form and not issubclass(self.form, GenericFKModelForm):
+            return GenericFKModelForm
+        if not issubclass(self.form, GenericFKModelForm):
             raise ImproperlyConfigured(
                 "If providing form for GenericFKAdmin, form must subclass"
                 " GenericFKModelForm"
             )
+        return self.form
+
+    def get_form_cache_key(self, request, obj=None, change=False, **kwargs):
+        """
+        Return the key the form class built by get_form is cached under, or
+        None to build a new one. The key covers everything ModelAdmin.get_form
+        builds the class from, but not obj itself. formfield_for_dbfield is
+        given the request, so forms are cached per user; override this if
+        your formfield overrides depend on anything else, e.g. the object
+        being edited.
+        """
+        if "fields" in kwargs:
+            fields = kwargs.pop("fields")
         else:
-            kwargs["form"] = self.form
+            fields = flatten_fieldsets(self.get_fieldsets(request, obj))
+        user = getattr(request, "user", None)
+        key = (
+            kwargs.pop("form", None) or self.get_form_class(),
+            change,
+            tuple(fields) if fields is not None else None,
+            tuple(self.get_exclude(request, obj) or ()),
+            tuple(self.get_readonly_fields(request, obj)),
+            tuple(self.generic_autocomplete_fields),
+            change and self.has_change_permission(request, obj),
+            getattr(user, "pk", None),
+            tuple(sorted(kwargs.items(), key=lambda item: item[0])),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            # e.g. widgets were passed, don't try to compare them
+            return None
+        return key
 
-        if self.filter_callback:
-            kwargs["form"].filter_callback = (
-                partial(self.filter_callback, **{"obj": obj})
-                if obj
-                else self.filter_callback
+    def get_form(self, request, obj=None, change=False, **kwargs):
+        """
+        Overrides get_form to ensure GenericFKModelForm is used instead of
+        the default ModelForm. The form classes are cached, building one runs
+        the metaclass and every formfield, and the filter_callback and
+        choices cache for this request are bound to a subclass of the cached
+        class that applies them to each form instance.
+        """
+        kwargs["form"] = self.get_form_class()
+
+        key = None
+        if self.form_cache_size:
+            key = self.get_form_cache_key(
+                request, obj=obj, change=change, **kwargs
             )
-        return super().get_form(request, obj=obj, change=change, **kwargs)
+        if key is None:
+            form = self.__build_form(request, obj=obj, change=change, **kwargs)
+        else:
+            with self.form_cache_lock:
+                form = self.form_cache.get(key)
+                if form is not None:
+                    self.form_cache.move_to_end(key)
+            if form is None:
+                form = self.__build_form(
+                    request, obj=obj, change=change, **kwargs
+                )
+                with self.form_cache_lock:
+                    self.form_cache[key] = form
+                    while len(self.form_cache) > self.form_cache_size:
+                        self.form_cache.popitem(last=False)
+
+        # bind the per request options to a subclass rather than the shared
+        # class, so concurrent requests never see each other's obj
+        options = {"choices_cache": self.get_choices_cache(request, obj)}
+        if self.filter_callback:
+            options["filter_callback"] = self.get_filter_callback(obj)
+        return form.with_generic_field_options(**options)
+
+    def __build_form(self, request, obj=None, change=False, **kwargs):
+        generic_widgets = self.get_generic_widgets()
+        if generic_widgets:
+            form_meta = getattr(kwargs["form"], "_meta", None)
+            kwargs["widgets"] = {
+                **(getattr(form_meta, "widgets", None) or {}),
+                **generic_widgets,
+                **kwargs.get("widgets", {}),
+            }
+        form = super().get_form(request, obj=obj, change=change, **kwargs)
+
+        # modelform_factory always builds a new class, so it's safe to point
+        # its generic fields at our configured targets
+        for generic_field in form.generic_fields:
+            form.base_fields[generic_field].targets = self.targets
+            form.base_fields[generic_field].union = self.generic_choices_union
+        return form
 
 
 __all__ = [
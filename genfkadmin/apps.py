@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class GenFKAdminConfig(AppConfig):
+    name = "genfkadmin"
+    verbose_name = "Generic FK Admin"
+
+    def ready(self):
+        from genfkadmin.registry import registry
+
+        registry.populate()
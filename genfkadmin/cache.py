@@ -0,0 +1,151 @@
+import hashlib
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import ForeignObjectRel
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+GENERATION_KEY = "genfkadmin:generation:{label}"
+CHOICES_KEY = "genfkadmin:choices:{label}:{generation}:{key}"
+OPTGROUP_KEY = "genfkadmin:optgroup:{label}:{generation}:{key}"
+
+# the cache aliases that hold choices for each watched target model
+watched_models = {}
+# the watched target models invalidated by signals from each sender
+watched_senders = {}
+
+
+def get_generations(cache, models):
+    """
+    Return the current generation of each of the models in the given cache.
+    A missing generation, never set or evicted, starts from the current time
+    so it can't collide with a generation that was used before.
+    """
+    keys = {
+        model: GENERATION_KEY.format(label=model._meta.label_lower)
+        for model in models
+    }
+    generations = cache.get_many(keys.values())
+    for model, key in keys.items():
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return {model: generations[key] for model, key in keys.items()}
+
+
+def bump_generation(cache, model):
+    """
+    Move the model to a new generation so the choices cached for it under
+    the previous one are no longer used.
+    """
+    key = GENERATION_KEY.format(label=model._meta.label_lower)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_choices(sender, **kwargs):
+    for model in watched_senders.get(sender, ()):
+        for alias in watched_models[model]:
+            bump_generation(caches[alias], model)
+
+
+def watch_model(model, alias=DEFAULT_CACHE_ALIAS, related_models=()):
+    """
+    Invalidate the choices cached for the model in the given cache whenever
+    one of its instances, or its many to many relations, change. Changes to
+    the instances of related_models, e.g. the models its labels are read
+    from, invalidate them too.
+    """
+    watched_models.setdefault(model, set()).add(alias)
+
+    senders = [model, *related_models]
+    for field in model._meta.get_fields():
+        if field.many_to_many:
+            senders.append(
+                field.through
+                if isinstance(field, ForeignObjectRel)
+                else field.remote_field.through
+            )
+    for sender in senders:
+        if model in watched_senders.setdefault(sender, set()):
+            continue
+        watched_senders[sender].add(model)
+        dispatch_uid = f"genfkadmin:{sender._meta.label_lower}"
+        post_save.connect(
+            invalidate_choices, sender=sender, dispatch_uid=dispatch_uid
+        )
+        post_delete.connect(
+            invalidate_choices, sender=sender, dispatch_uid=dispatch_uid
+        )
+        m2m_changed.connect(
+            invalidate_choices, sender=sender, dispatch_uid=dispatch_uid
+        )
+
+
+class GenericChoicesCache:
+    """
+    Stores the choices of each GenericTarget in Django's cache framework,
+    keyed by the given key (e.g. the admin and the filter applied) and the
+    target model's generation, which changes whenever the target model does.
+    """
+
+    def __init__(
+        self, key, alias=DEFAULT_CACHE_ALIAS, timeout=DEFAULT_TIMEOUT
+    ):
+        self.key = hashlib.md5(str(key).encode()).hexdigest()
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_keys(self, targets, key_format=CHOICES_KEY):
+        """
+        Return the cache key of each target's choices, or whatever
+        key_format names, at the target model's current generation. Read
+        the keys before loading the choices so that a change made while
+        loading is never cached as current.
+        """
+        generations = get_generations(
+            self.cache, [target.model for target in targets]
+        )
+        return {
+            target: key_format.format(
+                label=target.model._meta.label_lower,
+                generation=generations[target.model],
+                key=self.key,
+            )
+            for target in targets
+        }
+
+    def get_many(self, keys):
+        """
+        Return the cached choices, or rendered optgroups, of the targets
+        that have them.
+        """
+        cached = self.cache.get_many(keys.values())
+        return {
+            target: cached[key]
+            for target, key in keys.items()
+            if key in cached
+        }
+
+    def set_many(self, keys, choices):
+        """
+        Cache the choices, or rendered optgroup, of each target.
+        """
+        self.cache.set_many(
+            {keys[target]: value for target, value in choices.items()},
+            timeout=self.timeout,
+        )
+
+
+__all__ = [
+    "GenericChoicesCache",
+    "bump_generation",
+    "watch_model",
+]
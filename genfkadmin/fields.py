@@ -1,13 +1,122 @@
-import logging
-from traceback import format_exc
-
 from django import forms
-from django.contrib.contenttypes.fields import GenericRelation
-from django.db import OperationalError
+from django.core.exceptions import ObjectDoesNotExist
+
+from genfkadmin.targets import (
+    format_target_value,
+    get_generic_targets,
+    iter_union_choices,
+    parse_target_content_type,
+)
+from genfkadmin.widgets import GenericFKSelect
+
+try:
+    from django.utils.choices import BaseChoiceIterator
+except ImportError:  # drop when drop django 4.2
+    BaseChoiceIterator = object
+
+
+class GenericFKChoices:
+    """
+    The loaded choices of a GenericFKField, shared by the deep copies of the
+    field, i.e. the fields of the forms built from it. The choices are
+    nested tuples so every copy can read them without copying, along with
+    the options of the field they were loaded for.
+    """
+
+    __slots__ = ("choices", "options")
+
+    def __init__(self):
+        self.choices = None
+        self.options = None
+
+
+class GenericFKChoiceIterator(BaseChoiceIterator):
+    """
+    Lazily builds the optgroup choices for a GenericFKField. Nothing is
+    queried until the choices are iterated, which only happens when the
+    widget renders or the submitted value is validated.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        shared_choices = self.field.shared_choices
+        if shared_choices is None:
+            # the field declared on the form class never holds on to its
+            # choices, so they're loaded again for every form
+            yield from self.iter_choices()
+            return
+
+        options = self.field.get_choices_options()
+        if shared_choices.choices is None or shared_choices.options != options:
+            if shared_choices.choices is not None:
+                # the options of this copy changed, load its own choices
+                # rather than replacing the ones the other copies use
+                shared_choices = GenericFKChoices()
+                self.field.shared_choices = shared_choices
+            shared_choices.choices = tuple(
+                (group_label, tuple(choices))
+                for group_label, choices in self.iter_choices()
+            )
+            shared_choices.options = options
+        yield from shared_choices.choices
+
+    def iter_choices(self):
+        """
+        Yield the (group_label, choices) optgroup of each target.
+        """
+        for target, choices in self.iter_target_choices(
+            self.field.get_targets()
+        ):
+            yield target.group_label, choices
+
+    def iter_target_choices(self, targets):
+        """
+        Yield a (target, choices) tuple for each of the targets, from the
+        field's choices cache if it has one.
+        """
+        # The value of each choice is a formatted string FIELD_ID_FORMAT,
+        # that stores the necessary information to parse back out in the
+        # form on save to grab the content_type_id and object_id of the
+        # selected value.
+        choices_cache = self.field.choices_cache
+        if choices_cache is None:
+            yield from self.load_choices(targets)
+            return
+
+        keys = choices_cache.get_keys(targets)
+        cached_choices = choices_cache.get_many(keys)
+        missing_targets = [t for t in targets if t not in cached_choices]
+        if missing_targets:
+            loaded_choices = dict(self.load_choices(missing_targets))
+            choices_cache.set_many(keys, loaded_choices)
+            cached_choices.update(loaded_choices)
+        for target in targets:
+            yield target, cached_choices[target]
 
-from genfkadmin import FIELD_ID_FORMAT
+    def load_choices(self, targets):
+        """
+        Yield a (target, choices) tuple for each of the targets, loaded from
+        the database.
+        """
+        if self.field.union:
+            yield from iter_union_choices(
+                targets, filter_callback=self.field.filter_callback
+            )
+            return
 
-logger = logging.getLogger(__name__)
+        for target in targets:
+            queryset = target.get_queryset(
+                filter_callback=self.field.filter_callback
+            )
+            yield (
+                target,
+                [
+                    (value, label)
+                    for value, label, _ in target.iter_choices(queryset)
+                ],
+            )
 
 
 class GenericFKField(forms.ChoiceField):
@@ -16,62 +125,118 @@ class GenericFKField(forms.ChoiceField):
     models for the GenericForeignKey Relations.
     """
 
-    def __init__(self, model, *args, filter_callback=None, **kwargs):
-        """
-        Given a model and an optional, initialize the set of
-        choices that should be available for this field.
-        """
-        choices = []
-
-        # generic relations are stored in _relation_tree, so we can grab
-        # the models from those relations and develop a set of choices
-        # for the select input. The value of the choice is a formatted string
-        # FIELD_ID_FORMAT, that stores the necessary information to parse
-        # back out in the form on save to grab the content_type_id and
-        # object_id of the selected value.
-        for relation in model._meta._relation_tree:
-            if isinstance(relation, GenericRelation):
-                choices_for_model = []
-                try:
-                    queryset = relation.model.objects.all()
-                    if filter_callback and callable(filter_callback):
-                        try:
-                            queryset = filter_callback(queryset=queryset)
-                        except Exception:
-                            logging.warning(
-                                f"Unable to filter queryset with callback: {format_exc()}"
-                            )
-
-                    choices_for_model = [
-                        (
-                            FIELD_ID_FORMAT.format(
-                                app_label=i._meta.app_label,
-                                model_name=i._meta.model_name,
-                                pk=i.pk,
-                            ),
-                            str(i),
-                        )
-                        for i in queryset
-                    ]
-                except OperationalError:
-                    # table doesn't exist yet
-                    pass
-
-                app_label = relation.model._meta.app_label
-                app_label = app_label[0].upper() + app_label[1:]
-                choices.append(
-                    (
-                        f"{app_label} | {relation.model.__name__}",
-                        choices_for_model,
-                    )
-                )
-
-        super().__init__(
-            *args,
-            choices=choices,
-            **kwargs,
+    widget = GenericFKSelect
+    iterator = GenericFKChoiceIterator
+
+    def __init__(
+        self,
+        model,
+        *args,
+        filter_callback=None,
+        targets=None,
+        union=False,
+        choices_cache=None,
+        validate_choices=False,
+        **kwargs,
+    ):
+        """
+        Given a model, an optional filter_callback and optional configured
+        GenericTargets, store what is needed to build the set of choices for
+        this field. The choices themselves are only loaded when they are
+        iterated. With union, the choices of every target with label_fields
+        are loaded in a single UNION ALL query. With a GenericChoicesCache,
+        the choices are shared across requests until a target changes.
+        Submitted values are checked with a query for the chosen instance,
+        unless validate_choices asks for them to be found in the choices.
+        """
+        # skip ChoiceField.__init__() since the choices are computed lazily
+        forms.Field.__init__(self, *args, **kwargs)
+        self.model = model
+        self.filter_callback = filter_callback
+        self.targets = targets
+        self.union = union
+        self.choices_cache = choices_cache
+        self.validate_choices = validate_choices
+        self.shared_choices = None
+        self.widget.choices = self.choices
+
+    def get_targets(self):
+        """
+        Return the GenericTargets to build the choices from, defaulting to
+        every model related through a GenericRelation.
+        """
+        if self.targets is None:
+            return get_generic_targets(self.model)
+        return self.targets
+
+    def valid_value(self, value):
+        """
+        Check that the value is one of the choices by parsing out its target
+        and looking the instance up among that target's candidates, rather
+        than loading every choice.
+        """
+        if self.validate_choices or hasattr(self, "_choices"):
+            return super().valid_value(value)
+        try:
+            content_type, pk = parse_target_content_type(value)
+        except (ValueError, ObjectDoesNotExist):
+            return False
+        target = self.get_target(content_type.model_class())
+        if target is None:
+            return False
+        return target.has_candidate(pk, filter_callback=self.filter_callback)
+
+    def get_target(self, target_model):
+        """
+        Return the GenericTarget of the given model, or None if it isn't one
+        of the targets.
+        """
+        for target in self.get_targets():
+            if target.model is target_model:
+                return target
+        return None
+
+    def get_target_value(self, target_model, pk):
+        """
+        Return the value of the choice for the instance of target_model with
+        the given primary key, in the value_format of its GenericTarget.
+        """
+        target = self.get_target(target_model)
+        if target is None:
+            return format_target_value(target_model, pk)
+        return target.get_value(pk)
+
+    def get_choices_options(self):
+        """
+        Return the options the choices are loaded with, the shared choices
+        are only used by copies with the same options.
+        """
+        return (
+            self.filter_callback,
+            self.targets,
+            self.union,
+            self.choices_cache,
         )
 
+    def __deepcopy__(self, memo):
+        result = super(forms.ChoiceField, self).__deepcopy__(memo)
+        # copies share the choices, which are only loaded once for all of
+        # them
+        result.shared_choices = self.shared_choices or GenericFKChoices()
+        # force a new iterator bound to the copy, the widget copy still
+        # points at ours
+        result.widget.choices = result.choices
+        return result
+
+    def _get_choices(self):
+        # if choices were set explicitly, respect them. Otherwise return a
+        # fresh iterator so the choices are evaluated on every iteration
+        if hasattr(self, "_choices"):
+            return self._choices
+        return self.iterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField.choices.fset)
+
 
 __all__ = [
     "GenericFKField",
@@ -0,0 +1,63 @@
+from django.contrib.admin import RelatedFieldListFilter
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+
+
+class GenericContentTypeListFilter(RelatedFieldListFilter):
+    """
+    Filters the changelist of a GenericFKAdmin by the content type of a
+    GenericForeignKey. Use it on the content type field of the
+    GenericForeignKey, e.g. list_filter = [("content_type",
+    GenericContentTypeListFilter)], or list the GenericForeignKey in
+    GenericFKAdmin.generic_list_filter. Only the target models are offered,
+    and the facet counts are computed with a single GROUP BY query.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.targets = model_admin.targets
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        for generic_field in model_admin.generic_fields.values():
+            if generic_field["ct_field"] == field.name:
+                self.title = generic_field["label"]
+
+    def field_choices(self, field, request, model_admin):
+        content_types = ContentType.objects.get_for_models(
+            *[target.model for target in self.targets]
+        )
+        return [
+            (content_types[target.model].pk, target.group_label)
+            for target in self.targets
+        ]
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        # counted by get_facet_queryset instead
+        return {}
+
+    def get_facet_queryset(self, changelist):
+        filtered_qs = changelist.get_queryset(
+            self.request, exclude_parameters=self.expected_parameters()
+        )
+        content_type_ids = [pk_val for pk_val, _ in self.lookup_choices]
+        counts = dict(
+            filtered_qs.prefetch_related(None)
+            .filter(**{f"{self.field.attname}__in": content_type_ids})
+            .order_by()
+            .values_list(self.field.attname)
+            .annotate(count=Count("pk"))
+        )
+        facet_counts = {
+            f"{pk_val}__c": counts.get(pk_val, 0)
+            for pk_val in content_type_ids
+        }
+        if self.include_empty_choice:
+            facet_counts["__c"] = filtered_qs.filter(
+                **{self.lookup_kwarg_isnull: True}
+            ).count()
+        return facet_counts
+
+
+__all__ = [
+    "GenericContentTypeListFilter",
+]
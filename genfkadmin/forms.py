@@ -1,6 +1,7 @@
+import copy
+
 import django
 from django import forms
-from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import (
     ImproperlyConfigured,
@@ -13,8 +14,10 @@ from django.forms.models import (
     fields_for_model,
 )
 
-from genfkadmin import FIELD_ID_FORMAT, GENERIC_FIELD_NAME
 from genfkadmin.fields import GenericFKField
+from genfkadmin.registry import registry
+from genfkadmin.targets import parse_target_content_type
+from genfkadmin.widgets import GenericFKAutocompleteSelect
 
 
 class GenericFKModelFormMetaclass(DeclarativeFieldsMetaclass):
@@ -113,36 +116,35 @@ class GenericFKModelFormMetaclass(DeclarativeFieldsMetaclass):
             if base == GenericFKModelForm:
                 filter_callback = base.filter_callback
 
-        # private_fields has GenericForeignKeys, so we check for those here
-        # and inject a fake field into the form. We also remove the
+        # the registry knows the GenericForeignKeys of the model, so we inject
+        # a fake field into the form for each of them. We also remove the
         # content_type and foreign_key fields if they exist on the declared
         # fields of the form so that we only have the generic field.
-        for field in new_class._meta.model._meta.private_fields:
-            if isinstance(field, GenericForeignKey):
-                # we must name the generic field something other than the
-                # original name, because GenericForeignKey are
-                # editable=False and won't be allowed in the form
-                generic_field_name = GENERIC_FIELD_NAME.format(
-                    field_name=field.name
-                )
-                generic_fields[generic_field_name] = {
-                    "original_field_name": field.name,
-                    "ct_field": field.ct_field,
-                    "fk_field": field.fk_field,
-                }
-                fields.pop(field.ct_field, None)
-                fields.pop(field.fk_field, None)
-                display_name = " ".join(
-                    [p[0].upper() + p[1:] for p in field.name.split("_")]
-                )
-                fields[generic_field_name] = GenericFKField(
-                    field.model,
-                    filter_callback=filter_callback,
-                    label=display_name,
-                    help_text=(
-                        field.help_text if hasattr(field, "help_text") else ""
-                    ),  # drop when drop django 4.2
-                )
+        metadata = registry.get(new_class._meta.model)
+        for (
+            generic_field_name,
+            generic_field,
+        ) in metadata.generic_fields.items():
+            # the generic field is named something other than the
+            # original name, because GenericForeignKey are
+            # editable=False and won't be allowed in the form
+            fields.pop(generic_field["ct_field"], None)
+            fields.pop(generic_field["fk_field"], None)
+            if opts.exclude and generic_field_name in opts.exclude:
+                # e.g. the generic field is read only in the admin, skip
+                # building it altogether
+                continue
+            generic_fields[generic_field_name] = generic_field
+            widget_kwargs = {}
+            if opts.widgets and generic_field_name in opts.widgets:
+                widget_kwargs["widget"] = opts.widgets[generic_field_name]
+            fields[generic_field_name] = GenericFKField(
+                new_class._meta.model,
+                filter_callback=filter_callback,
+                **widget_kwargs,
+                label=generic_field["label"],
+                help_text=generic_field["help_text"],
+            )
 
         new_class.base_fields = fields
         new_class.generic_fields = generic_fields
@@ -161,38 +163,76 @@ class GenericFKModelForm(
 
     filter_callback = None
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # autocomplete widgets pass the instance along so that the
+        # filter_callback can be applied to the searched targets
+        if self.instance.pk is not None:
+            for generic_field in self.generic_fields:
+                widget = self.fields[generic_field].widget
+                if isinstance(widget, GenericFKAutocompleteSelect):
+                    widget.attrs["data-object-id"] = self.instance.pk
+
+    @classmethod
+    def with_generic_field_options(cls, **options):
+        """
+        Return a subclass whose generic fields are copies with the given
+        options, e.g. the filter_callback or choices_cache, set. The subclass
+        declares no fields, so the metaclass is skipped and the other fields
+        built for this class are shared rather than built again. The forms
+        of the subclass share the choices of its generic fields.
+        """
+        base_fields = dict(cls.base_fields)
+        for generic_field in cls.generic_fields:
+            field = base_fields[generic_field] = copy.deepcopy(
+                cls.base_fields[generic_field]
+            )
+            for attr, value in options.items():
+                setattr(field, attr, value)
+        return type.__new__(
+            type(cls),
+            cls.__name__,
+            (cls,),
+            {
+                "__module__": cls.__module__,
+                "__qualname__": cls.__qualname__,
+                "base_fields": base_fields,
+            },
+        )
+
     def get_initial_for_field(self, field, field_name):
         # generate the initial value for any of the generic fields so that
-        # the correct choice is auto selected
+        # the correct choice is auto selected. It's built from the stored
+        # content type id and object id rather than the GenericForeignKey,
+        # so the target isn't fetched
         if field_name in self.generic_fields:
-            target_instance = getattr(
-                self.instance,
-                self.generic_fields[field_name]["original_field_name"],
+            generic_field = self.generic_fields[field_name]
+            content_type_id = getattr(
+                self.instance, generic_field["ct_attname"]
             )
-            if target_instance:
-                return FIELD_ID_FORMAT.format(
-                    app_label=target_instance._meta.app_label,
-                    model_name=target_instance._meta.model_name,
-                    pk=target_instance.pk,
-                )
+            object_id = getattr(self.instance, generic_field["fk_field"])
+            if content_type_id is not None and object_id is not None:
+                target_model = ContentType.objects.get_for_id(
+                    content_type_id
+                ).model_class()
+                if target_model is not None:
+                    return self.fields[field_name].get_target_value(
+                        target_model, object_id
+                    )
         return super().get_initial_for_field(field, field_name)
 
     def save(self, commit=True):
         instance = super().save(commit=commit)
 
-        # for the generic fields, we parse the value out of FIELD_ID_FORMAT
-        # which gives us the ability to query for the ContentType and get the
-        # primary key of the related field. We use setattr to update these
-        # values dynamically
+        # for the generic fields, we parse the ContentType and the primary
+        # key of the related field out of the value. The ContentType comes
+        # from ContentType's cache, so this doesn't query once it's warm. We
+        # use setattr to update these values dynamically
         for generic_field, related_fields in self.generic_fields.items():
-            target_model_instance = self.cleaned_data[generic_field]
-            app_label, rest = target_model_instance.split("$")
-            model_name, dirty_id = rest.split("[")
-
-            content_type = ContentType.objects.get(
-                app_label=app_label, model=model_name
+            content_type, object_id = parse_target_content_type(
+                self.cleaned_data[generic_field]
             )
-            object_id = dirty_id.strip("[").strip("]")
 
             setattr(instance, related_fields["ct_field"], content_type)
             setattr(instance, related_fields["fk_field"], object_id)
@@ -200,6 +240,53 @@ class GenericFKModelForm(
         return instance
 
 
+class GenericFKReassignForm(forms.Form):
+    """
+    The form of GenericFKAdmin's reassign_generic_target action, picking one
+    of the model's GenericForeignKeys and the target to point it at. The
+    target is a GenericFKField built with the given field options, e.g. the
+    admin's targets and filter_callback, so it's validated the same way.
+    """
+
+    def __init__(self, *args, model, field_options=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generic_fields = registry.get(model).generic_fields
+        self.fields["generic_field"] = forms.ChoiceField(
+            label="Field",
+            choices=[
+                (generic_field_name, generic_field["label"])
+                for generic_field_name, generic_field in (
+                    self.generic_fields.items()
+                )
+            ],
+        )
+        if len(self.generic_fields) == 1:
+            # there's nothing to pick
+            self.fields["generic_field"].widget = forms.HiddenInput()
+            self.fields["generic_field"].initial = next(
+                iter(self.generic_fields)
+            )
+        self.fields["target"] = GenericFKField(
+            model, label="Target", **(field_options or {})
+        )
+
+    def get_update_kwargs(self):
+        """
+        Return the values of the content type and object id columns that
+        point the chosen GenericForeignKey at the chosen target. The
+        ContentType comes from ContentType's cache.
+        """
+        generic_field = self.generic_fields[self.cleaned_data["generic_field"]]
+        content_type, object_id = parse_target_content_type(
+            self.cleaned_data["target"]
+        )
+        return {
+            generic_field["ct_attname"]: content_type.pk,
+            generic_field["fk_field"]: object_id,
+        }
+
+
 __all__ = [
     "GenericFKModelForm",
+    "GenericFKReassignForm",
 ]
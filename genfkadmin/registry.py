@@ -0,0 +1,108 @@
+from functools import cached_property
+
+from django.apps import apps
+from django.contrib.contenttypes.fields import (
+    GenericForeignKey,
+    GenericRelation,
+)
+from django.contrib.contenttypes.models import ContentType
+
+from genfkadmin import GENERIC_FIELD_NAME
+
+
+class GenericFKMetadata:
+    """
+    The GenericForeignKeys of a model and the models related to it through
+    GenericRelations, introspected once so the request path only does
+    attribute and dictionary lookups.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+        # store a mapping of our GenericForeignKeys, by the name of the
+        # generated field, to their content_type and foreign_key fields
+        self.generic_fields = {}
+        self.generic_related_fields = set()
+        for field in model._meta.private_fields:
+            if isinstance(field, GenericForeignKey):
+                self.generic_fields[
+                    GENERIC_FIELD_NAME.format(field_name=field.name)
+                ] = {
+                    "original_field_name": field.name,
+                    "ct_field": field.ct_field,
+                    "ct_attname": model._meta.get_field(
+                        field.ct_field
+                    ).attname,
+                    "fk_field": field.fk_field,
+                    "label": " ".join(
+                        [p[0].upper() + p[1:] for p in field.name.split("_")]
+                    ),
+                    "help_text": (
+                        field.help_text if hasattr(field, "help_text") else ""
+                    ),  # drop when drop django 4.2
+                }
+                self.generic_related_fields.add(field.ct_field)
+                self.generic_related_fields.add(field.fk_field)
+
+    @cached_property
+    def target_models(self):
+        """
+        The models related to this model through a GenericRelation.
+        """
+        # generic relations are stored in _relation_tree, so we can grab
+        # the models from those relations
+        target_models = []
+        for relation in self.model._meta._relation_tree:
+            if (
+                isinstance(relation, GenericRelation)
+                and relation.model not in target_models
+            ):
+                target_models.append(relation.model)
+        return target_models
+
+    @cached_property
+    def content_type_ids(self):
+        """
+        The ContentType id of each of the target models. These are looked up
+        on first use rather than when the registry is built so that building
+        it never touches the database.
+        """
+        return {
+            target_model: content_type.id
+            for target_model, content_type in (
+                ContentType.objects.get_for_models(*self.target_models).items()
+            )
+        }
+
+
+class GenericFKRegistry:
+    """
+    Holds the GenericFKMetadata of every model. It's populated when the
+    genfkadmin app is ready, and fills in any model asked for before then.
+    """
+
+    def __init__(self):
+        self.metadata = {}
+
+    def populate(self):
+        for model in apps.get_models():
+            metadata = self.get(model)
+            if metadata.generic_fields:
+                metadata.target_models
+
+    def get(self, model):
+        try:
+            return self.metadata[model]
+        except KeyError:
+            return self.metadata.setdefault(model, GenericFKMetadata(model))
+
+
+registry = GenericFKRegistry()
+
+
+__all__ = [
+    "GenericFKMetadata",
+    "GenericFKRegistry",
+    "registry",
+]
@@ -0,0 +1,37 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $.fn.genericFKSelect2 = function() {
+        $.each(this, function(i, element) {
+            // the cursor to send for each page of the current search
+            const cursors = {};
+            $(element).select2({
+                ajax: {
+                    data: (params) => {
+                        return {
+                            term: params.term,
+                            cursor: cursors[params.page || 1],
+                            object_id: element.dataset.objectId
+                        };
+                    },
+                    processResults: (data, params) => {
+                        cursors[(params.page || 1) + 1] = data.pagination.next;
+                        return data;
+                    }
+                }
+            });
+        });
+        return this;
+    };
+
+    $(function() {
+        // Initialize all generic autocomplete widgets except the one in the
+        // template form used when a new formset is added.
+        $('.admin-generic-autocomplete').not('[name*=__prefix__]').genericFKSelect2();
+    });
+
+    document.addEventListener('formset:added', (event) => {
+        $(event.target).find('.admin-generic-autocomplete').genericFKSelect2();
+    });
+}
@@ -0,0 +1,588 @@
+import logging
+import operator
+import re
+from functools import cached_property, reduce
+from string import Formatter
+from traceback import format_exc
+
+from django.apps import apps
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ObjectDoesNotExist,
+    ValidationError,
+)
+from django.db import connections
+from django.db.models import CharField, F, IntegerField, Q, Value, Window
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Cast, Concat, RowNumber
+from django.utils.text import smart_split, unescape_string_literal
+
+from genfkadmin import FIELD_ID_FORMAT
+from genfkadmin.registry import registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_ID_VALUE = re.compile(r"(\d+):(.*)", re.DOTALL)
+
+
+def get_target_models(model):
+    """
+    Return the models related to the given model through a GenericRelation.
+    """
+    return registry.get(model).target_models
+
+
+def get_target_queryset(target_model, filter_callback=None):
+    """
+    Return the queryset of candidate targets for the given model, filtered
+    by the filter_callback if there is one.
+    """
+    return apply_filter_callback(target_model.objects.all(), filter_callback)
+
+
+def apply_filter_callback(queryset, filter_callback=None):
+    """
+    Filter the queryset with the filter_callback if there is one.
+    """
+    if filter_callback and callable(filter_callback):
+        try:
+            queryset = filter_callback(queryset=queryset)
+        except Exception:
+            logger.warning(
+                f"Unable to filter queryset with callback: {format_exc()}"
+            )
+    return queryset
+
+
+def get_group_label(target_model):
+    """
+    Return the "App | Model" label used to group the choices of a target.
+    """
+    app_label = target_model._meta.app_label
+    app_label = app_label[0].upper() + app_label[1:]
+    return f"{app_label} | {target_model.__name__}"
+
+
+def get_value_kwargs(target_model, value_format=FIELD_ID_FORMAT):
+    """
+    Return the keyword arguments, other than pk, that value_format is
+    formatted with for the instances of target_model. The ContentType is
+    only looked up if value_format uses its id.
+    """
+    opts = target_model._meta
+    kwargs = {"app_label": opts.app_label, "model_name": opts.model_name}
+    if "{content_type_id}" in value_format:
+        kwargs["content_type_id"] = ContentType.objects.get_for_model(
+            target_model
+        ).id
+    return kwargs
+
+
+def format_target_value(target_model, pk, value_format=FIELD_ID_FORMAT):
+    """
+    Return the value identifying the instance of target_model with the given
+    primary key, in FIELD_ID_FORMAT or CONTENT_TYPE_ID_FORMAT.
+    """
+    return value_format.format(
+        pk=pk, **get_value_kwargs(target_model, value_format)
+    )
+
+
+def get_target_value(target_instance, value_format=FIELD_ID_FORMAT):
+    """
+    Return the value identifying the given target instance.
+    """
+    return format_target_value(
+        type(target_instance), target_instance.pk, value_format
+    )
+
+
+def parse_target_value(value):
+    """
+    Parse a FIELD_ID_FORMAT value back out into its app_label, model_name
+    and primary key. Raises ValueError if the value isn't in that format.
+    """
+    app_label, rest = value.split("$")
+    model_name, dirty_id = rest.split("[")
+    return app_label, model_name, dirty_id.strip("[").strip("]")
+
+
+def parse_target_content_type(value):
+    """
+    Parse a CONTENT_TYPE_ID_FORMAT or FIELD_ID_FORMAT value into its
+    ContentType and primary key. ContentTypes are looked up through
+    ContentType's cache, so only the first lookup of each one is queried.
+    Raises ValueError if the value isn't in either format and
+    ContentType.DoesNotExist if its ContentType doesn't exist.
+    """
+    match = CONTENT_TYPE_ID_VALUE.fullmatch(value)
+    if match:
+        content_type_id, pk = match.groups()
+        return ContentType.objects.get_for_id(int(content_type_id)), pk
+    app_label, model_name, pk = parse_target_value(value)
+    return ContentType.objects.get_by_natural_key(app_label, model_name), pk
+
+
+def get_target_instance(value):
+    """
+    Return the target instance identified by a FIELD_ID_FORMAT or
+    CONTENT_TYPE_ID_FORMAT value, or None if the value can't be resolved.
+    """
+    try:
+        content_type, pk = parse_target_content_type(value)
+        target_model = content_type.model_class()
+        if target_model is None:
+            return None
+        return target_model._default_manager.filter(pk=pk).first()
+    except (ValueError, ObjectDoesNotExist, ValidationError):
+        return None
+
+
+class GenericTarget:
+    """
+    A model related through a GenericRelation along with the options that
+    control how its candidates are searched, ordered and labelled. Searching
+    and ordering are applied in the database so they can make use of the
+    indexes on the target model. select_related, prefetch_related and only
+    are applied to the candidates' queryset for labels that use __str__.
+    """
+
+    def __init__(
+        self,
+        model,
+        search_fields=(),
+        ordering=(),
+        label_fields=(),
+        label_format=None,
+        select_related=(),
+        prefetch_related=(),
+        only=(),
+        value_format=FIELD_ID_FORMAT,
+    ):
+        self.model = model
+        self.search_fields = tuple(search_fields)
+        self.ordering = tuple(ordering)
+        self.label_fields = tuple(label_fields)
+        self.label_format = label_format or " ".join(
+            f"{{{field_name}}}" for field_name in self.label_fields
+        )
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.only = tuple(only)
+        self.value_format = value_format
+        self.check_ordering()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.model._meta.label}>"
+
+    @property
+    def group_label(self):
+        return get_group_label(self.model)
+
+    def get_queryset(self, filter_callback=None):
+        """
+        Return the ordered queryset of candidates for this target.
+        """
+        queryset = apply_filter_callback(
+            self.apply_hints(self.model.objects.all()), filter_callback
+        )
+        if self.ordering or not queryset.ordered:
+            return queryset.order_by(*self.get_ordering())
+        return queryset
+
+    def has_candidate(self, pk, filter_callback=None):
+        """
+        Return whether the instance with the given primary key is one of
+        the candidates for this target, with a single query on the primary
+        key.
+        """
+        queryset = apply_filter_callback(
+            self.model.objects.all(), filter_callback
+        )
+        try:
+            return queryset.filter(pk=pk).exists()
+        except (ValueError, TypeError, ValidationError):
+            return False
+
+    def apply_hints(self, queryset):
+        """
+        Apply the select_related, prefetch_related and only hints to the
+        queryset.
+        """
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+    def get_related_models(self):
+        """
+        Return the models, other than the target model, that the
+        label_fields, select_related, prefetch_related and only paths reach.
+        A change to one of them can change the labels of the candidates.
+        """
+        related_models = []
+        for path in (
+            *self.label_fields,
+            *self.select_related,
+            *(p for p in self.prefetch_related if isinstance(p, str)),
+            *self.only,
+        ):
+            opts = self.model._meta
+            for path_part in path.split(LOOKUP_SEP):
+                try:
+                    field = opts.get_field(path_part)
+                except FieldDoesNotExist:
+                    break
+                if not field.is_relation or field.related_model is None:
+                    break
+                if field.related_model not in related_models:
+                    related_models.append(field.related_model)
+                opts = field.related_model._meta
+        return [
+            related_model
+            for related_model in related_models
+            if related_model is not self.model
+        ]
+
+    def check_ordering(self):
+        """
+        Raise ImproperlyConfigured unless every field of the ordering is a
+        non-nullable column of the model or of a non-nullable relation.
+        Candidates are paged by seeking past the values of these fields, so
+        a NULL would skip rows or make a cursor that can't be followed.
+        """
+        for field_name in self.ordering:
+            opts = self.model._meta
+            for path_part in field_name.removeprefix("-").split(LOOKUP_SEP):
+                if path_part == "pk":
+                    path_part = opts.pk.name
+                try:
+                    field = opts.get_field(path_part)
+                except FieldDoesNotExist:
+                    field = None
+                if (
+                    field is None
+                    or not field.concrete
+                    or field.null
+                    or field.many_to_many
+                ):
+                    raise ImproperlyConfigured(
+                        f"{field_name} in the ordering of generic target"
+                        f" {self.model._meta.label} must be a non-nullable"
+                        " field"
+                    )
+                if field.is_relation:
+                    opts = field.path_infos[-1].to_opts
+
+    def get_ordering(self):
+        """
+        Return the declared ordering with pk as a tie breaker, so that every
+        candidate has a unique position.
+        """
+        return (*self.ordering, "pk")
+
+    def get_seek_filter(self, key):
+        """
+        Return a Q object matching the candidates positioned after the given
+        key, a sequence of values for each field of get_ordering(). This lets
+        a page be fetched by seeking an index rather than by an offset.
+        """
+        filters = []
+        preceding = {}
+        for field_name, value in zip(self.get_ordering(), key):
+            lookup = "lt" if field_name.startswith("-") else "gt"
+            field_name = field_name.removeprefix("-")
+            filters.append(
+                Q(**preceding, **{f"{field_name}__{lookup}": value})
+            )
+            preceding[field_name] = value
+        return reduce(operator.or_, filters)
+
+    def construct_search(self, field_name):
+        """
+        Return the lookup to use for a search field, following the same
+        prefixes as ModelAdmin.search_fields. Prefer "^" or an explicit
+        lookup like "value__startswith" so the search can use an index.
+        """
+        if field_name.startswith("^"):
+            return "%s__istartswith" % field_name.removeprefix("^")
+        elif field_name.startswith("="):
+            return "%s__iexact" % field_name.removeprefix("=")
+        elif field_name.startswith("@"):
+            return "%s__search" % field_name.removeprefix("@")
+        # use field_name if it includes a lookup
+        opts = self.model._meta
+        prev_field = None
+        for path_part in field_name.split(LOOKUP_SEP):
+            if path_part == "pk":
+                path_part = opts.pk.name
+            try:
+                field = opts.get_field(path_part)
+            except FieldDoesNotExist:
+                if prev_field and prev_field.get_lookup(path_part):
+                    return field_name
+            else:
+                prev_field = field
+                if hasattr(field, "path_infos"):
+                    # follow the relation
+                    opts = field.path_infos[-1].to_opts
+        return "%s__icontains" % field_name
+
+    def search(self, queryset, term):
+        """
+        Filter the queryset by the search term, each word of the term must
+        match at least one of the search_fields.
+        """
+        if not self.search_fields or not term:
+            return queryset
+
+        orm_lookups = [
+            self.construct_search(str(field_name))
+            for field_name in self.search_fields
+        ]
+        for bit in smart_split(term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            queryset = queryset.filter(
+                reduce(
+                    operator.or_,
+                    [Q(**{orm_lookup: bit}) for orm_lookup in orm_lookups],
+                )
+            )
+        if any(
+            lookup_spawns_duplicates(self.model._meta, orm_lookup)
+            for orm_lookup in orm_lookups
+        ):
+            queryset = queryset.distinct()
+        return queryset
+
+    def get_value(self, pk):
+        """
+        Return the value identifying the candidate with the given primary
+        key, in the target's value_format.
+        """
+        return self.value_format.format(pk=pk, **self.value_kwargs)
+
+    @cached_property
+    def value_kwargs(self):
+        return get_value_kwargs(self.model, self.value_format)
+
+    def format_label(self, values):
+        """
+        Return the label built from the given values of the label_fields.
+        """
+        return self.label_format.format(
+            **{
+                field_name: "" if value is None else value
+                for field_name, value in zip(self.label_fields, values)
+            }
+        )
+
+    def get_label(self, target_instance):
+        """
+        Return the label for a target instance, built from the label_fields
+        if there are any.
+        """
+        if not self.label_fields:
+            return str(target_instance)
+
+        values = []
+        for field_name in self.label_fields:
+            value = target_instance
+            for path_part in field_name.split(LOOKUP_SEP):
+                value = getattr(value, path_part, None)
+            values.append(value)
+        return self.format_label(values)
+
+    def iter_choices(self, queryset, extra_fields=()):
+        """
+        Yield a (value, label, extra_values) tuple for every candidate in the
+        queryset, where extra_values are the values of the extra_fields.
+
+        With label_fields, only the pk, extra_fields and label_fields are
+        read with values_list, related label_fields are joined in the same
+        query, and no model instances are created. Otherwise the label is
+        str() of each instance.
+        """
+        if self.label_fields:
+            for pk, *values in queryset.values_list(
+                "pk", *extra_fields, *self.label_fields
+            ):
+                yield (
+                    self.get_value(pk),
+                    self.format_label(values[len(extra_fields) :]),
+                    values[: len(extra_fields)],
+                )
+        else:
+            for target_instance in queryset:
+                yield (
+                    self.get_value(target_instance.pk),
+                    str(target_instance),
+                    [getattr(target_instance, f) for f in extra_fields],
+                )
+
+    def get_label_expression(self):
+        """
+        Return a database expression building the same label as
+        format_label, or None if the label can't be built in SQL, i.e.
+        there are no label_fields or label_format uses format specs or
+        conversions.
+        """
+        if not self.label_fields:
+            return None
+
+        parts = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(
+            self.label_format
+        ):
+            if format_spec or conversion:
+                return None
+            if literal:
+                parts.append(Value(literal))
+            if field_name is not None:
+                if field_name not in self.label_fields:
+                    return None
+                parts.append(Cast(F(field_name), output_field=CharField()))
+        if len(parts) == 1:
+            return parts[0]
+        return Concat(*parts, output_field=CharField())
+
+    def get_union_queryset(self, group, filter_callback=None):
+        """
+        Return a values_list queryset of (group, position, pk, label) rows
+        for this target that can be combined with other targets' with
+        UNION ALL, or None if the label can't be built in SQL. The position
+        numbers the rows in the target's ordering since the combined query
+        can't keep each target's own ORDER BY.
+        """
+        label_expression = self.get_label_expression()
+        if label_expression is None:
+            return None
+
+        queryset = self.get_queryset(filter_callback=filter_callback)
+        if connections[queryset.db].features.supports_over_clause:
+            position = Window(
+                RowNumber(),
+                order_by=[
+                    F(field_name.removeprefix("-")).desc()
+                    if field_name.startswith("-")
+                    else F(field_name).asc()
+                    for field_name in self.get_ordering()
+                ],
+            )
+        else:
+            position = Value(0, output_field=IntegerField())
+        return (
+            queryset.order_by()
+            .annotate(
+                _gfk_group=Value(group, output_field=IntegerField()),
+                _gfk_position=position,
+                _gfk_pk=Cast("pk", output_field=CharField()),
+                _gfk_label=label_expression,
+            )
+            .values_list(
+                "_gfk_group", "_gfk_position", "_gfk_pk", "_gfk_label"
+            )
+        )
+
+
+def iter_union_choices(targets, filter_callback=None):
+    """
+    Yield a (target, choices) tuple for each target, where choices are
+    (value, label) tuples. The choices of every target whose label can be
+    built in SQL are read in a single UNION ALL query, the remaining targets
+    are read with a query each.
+    """
+    choices = {}
+    union_querysets = []
+    for group, target in enumerate(targets):
+        union_queryset = target.get_union_queryset(
+            group, filter_callback=filter_callback
+        )
+        if union_queryset is None:
+            queryset = target.get_queryset(filter_callback=filter_callback)
+            choices[group] = [
+                (value, label)
+                for value, label, _ in target.iter_choices(queryset)
+            ]
+        else:
+            choices[group] = []
+            union_querysets.append(union_queryset)
+
+    if union_querysets:
+        union_queryset = union_querysets[0]
+        if len(union_querysets) > 1:
+            union_queryset = union_queryset.union(
+                *union_querysets[1:], all=True
+            )
+        for group, _, pk, label in union_queryset.order_by(
+            "_gfk_group", "_gfk_position"
+        ):
+            choices[group].append((targets[group].get_value(pk), label))
+
+    for group, target in enumerate(targets):
+        yield target, choices[group]
+
+
+def get_generic_targets(
+    model, target_options=None, value_format=FIELD_ID_FORMAT
+):
+    """
+    Return a GenericTarget for every model related to the given model
+    through a GenericRelation, configured with the target_options declared
+    for it. target_options are keyed by model or "app_label.ModelName".
+    """
+    target_models = get_target_models(model)
+    options_by_model = {}
+    for key, options in (target_options or {}).items():
+        try:
+            target_model = apps.get_model(key) if isinstance(key, str) else key
+        except (ValueError, LookupError):
+            target_model = None
+        if target_model not in target_models:
+            raise ImproperlyConfigured(
+                f"{key} is not related to {model.__name__} through a"
+                " GenericRelation"
+            )
+        options_by_model[target_model] = options
+
+    generic_targets = []
+    for target_model in target_models:
+        try:
+            generic_targets.append(
+                GenericTarget(
+                    target_model,
+                    **{
+                        "value_format": value_format,
+                        **options_by_model.get(target_model, {}),
+                    },
+                )
+            )
+        except TypeError as e:
+            raise ImproperlyConfigured(
+                f"Invalid options for generic target"
+                f" {target_model._meta.label}: {e}"
+            )
+    return generic_targets
+
+
+__all__ = [
+    "GenericTarget",
+    "apply_filter_callback",
+    "format_target_value",
+    "get_generic_targets",
+    "get_group_label",
+    "get_target_instance",
+    "get_target_models",
+    "get_target_queryset",
+    "get_target_value",
+    "iter_union_choices",
+    "parse_target_content_type",
+    "parse_target_value",
+]
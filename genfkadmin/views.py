@@ -0,0 +1,225 @@
+import base64
+import binascii
+import json
+from itertools import groupby
+
+from django.contrib.admin.utils import unquote
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import (
+    BadRequest,
+    PermissionDenied,
+    ValidationError,
+)
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.views.generic import View
+
+from genfkadmin.registry import registry
+
+
+class GenericFKAutocompleteJsonView(View):
+    """
+    Handle GenericFKAutocompleteSelect's AJAX requests for data, searching
+    across every model related through a GenericRelation.
+    """
+
+    paginate_by = 20
+    admin = None
+
+    def get(self, request, field_name):
+        """
+        Return a JsonResponse with search results grouped by target model:
+        {
+            results: [
+                {text: "App | Model", children: [{id: "...", text: "foo"}]}
+            ],
+            pagination: {more: true, next: "<cursor>"}
+        }
+        The next cursor is passed back as the cursor parameter to fetch the
+        following page.
+        """
+        if field_name not in self.admin.generic_fields:
+            raise Http404(f"{field_name} is not a generic field")
+
+        if not self.has_perm(request):
+            raise PermissionDenied
+
+        self.term = request.GET.get("term", "")
+        self.cursor = self.decode_cursor(request.GET.get("cursor"))
+
+        obj = None
+        object_id = request.GET.get("object_id")
+        if object_id:
+            obj = self.admin.get_object(request, unquote(object_id))
+        self.filter_callback = self.admin.get_filter_callback(obj)
+
+        rows = self.get_rows()
+        more = len(rows) > self.paginate_by
+        return JsonResponse(
+            {
+                "results": [
+                    {
+                        "text": target.group_label,
+                        "children": [
+                            self.serialize_result(value, label)
+                            for _, (value, label, _) in target_rows
+                        ],
+                    }
+                    for target, target_rows in groupby(
+                        rows[: self.paginate_by], key=lambda row: row[0]
+                    )
+                ],
+                "pagination": {
+                    "more": more,
+                    "next": (
+                        self.encode_cursor(*rows[self.paginate_by - 1])
+                        if more
+                        else None
+                    ),
+                },
+            }
+        )
+
+    def serialize_result(self, value, label):
+        """
+        Convert the provided choice to a dictionary that is added to the
+        children of its group.
+        """
+        return {"id": value, "text": label}
+
+    def get_queryset(self, target):
+        """
+        Return the searched queryset for a target. The target's declared
+        search_fields are used, falling back to the search fields of the
+        target model's registered ModelAdmin. Returns None if the target
+        can't be searched.
+        """
+        queryset = target.get_queryset(filter_callback=self.filter_callback)
+        if not self.term:
+            return queryset
+        return self.admin.get_target_search_results(
+            self.request, target, queryset, self.term
+        )
+
+    def get_rows(self):
+        """
+        Return up to paginate_by + 1 (target, (value, label, key)) rows
+        following the cursor, continuing from one target into the next. Each
+        target is read in the order of its get_ordering() and resumed by
+        seeking past the cursor's key, so every page costs the same as the
+        first.
+        """
+        remaining = self.paginate_by + 1
+        rows = []
+        seeking = self.cursor is not None
+        for target in self.admin.targets:
+            content_type_id = self.get_content_type_id(target)
+            if seeking and content_type_id != self.cursor[0]:
+                # the cursor is further along, skip this target
+                continue
+
+            queryset = self.get_queryset(target)
+            if queryset is None:
+                continue
+            ordering = target.get_ordering()
+            key_fields = {
+                f"_gfk_key_{i}": F(field_name.removeprefix("-"))
+                for i, field_name in enumerate(ordering)
+            }
+            queryset = queryset.annotate(**key_fields).order_by(*ordering)
+            if seeking:
+                key = self.cursor[1]
+                if not isinstance(key, list) or len(key) != len(ordering):
+                    raise BadRequest("Invalid cursor")
+                try:
+                    queryset = queryset.filter(target.get_seek_filter(key))
+                except (ValueError, TypeError, ValidationError):
+                    raise BadRequest("Invalid cursor")
+                seeking = False
+
+            choices = list(
+                target.iter_choices(queryset[:remaining], key_fields)
+            )
+            rows.extend((target, choice) for choice in choices)
+            remaining -= len(choices)
+            if remaining <= 0:
+                break
+        return rows
+
+    def get_content_type_id(self, target):
+        return registry.get(self.admin.model).content_type_ids[target.model]
+
+    def encode_cursor(self, target, choice):
+        """
+        Encode the position of a row as an opaque cursor made up of its
+        content type and the values of its ordering key.
+        """
+        _, _, key = choice
+        return base64.urlsafe_b64encode(
+            json.dumps(
+                [self.get_content_type_id(target), key], cls=DjangoJSONEncoder
+            ).encode()
+        ).decode()
+
+    def decode_cursor(self, cursor):
+        """
+        Decode a cursor made by encode_cursor into its content type id and
+        ordering key.
+        """
+        if not cursor:
+            return None
+        try:
+            content_type_id, key = json.loads(
+                base64.urlsafe_b64decode(cursor.encode())
+            )
+        except (binascii.Error, ValueError, TypeError):
+            raise BadRequest("Invalid cursor")
+        return content_type_id, key
+
+    def has_perm(self, request):
+        """
+        Check if the user is allowed to pick a generic target, i.e. they may
+        add or change the model of the GenericFKAdmin.
+        """
+        return self.admin.has_add_permission(
+            request
+        ) or self.admin.has_change_permission(request)
+
+
+class GenericFKChangeList(ChangeList):
+    """
+    A ChangeList that resolves the generic targets of the rows on the page
+    in a query per target model, rather than a query per row for every
+    GenericForeignKey that's displayed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.search_fields and self.model_admin.generic_search_fields:
+            # show the search box when only the generic targets are searched
+            self.search_fields = self.model_admin.generic_search_fields
+
+    def get_ordering_field(self, field_name):
+        """
+        Sort the columns ordered by a generic field by the label of each
+        row's target, computed in the database.
+        """
+        order_field = super().get_ordering_field(field_name)
+        if order_field in self.model_admin.generic_fields:
+            return self.model_admin.get_generic_label_expression(order_field)
+        return order_field
+
+    def get_results(self, request):
+        super().get_results(request)
+        # only the rows on the page are prefetched, the querysets used for
+        # actions, counts and facets are left alone
+        prefetches = self.model_admin.get_generic_prefetches(request)
+        if prefetches:
+            self.result_list = self.result_list.prefetch_related(*prefetches)
+
+
+__all__ = [
+    "GenericFKAutocompleteJsonView",
+    "GenericFKChangeList",
+]
@@ -0,0 +1,255 @@
+import json
+
+from django import forms
+from django.conf import settings
+from django.contrib.admin.widgets import get_select2_language
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.forms.utils import flatatt
+from django.utils.html import conditional_escape, format_html
+from django.utils.safestring import mark_safe
+
+from genfkadmin.cache import OPTGROUP_KEY
+from genfkadmin.targets import GenericTarget, parse_target_content_type
+
+
+class GenericFKSelect(forms.Select):
+    """
+    The default widget for GenericFKField. Renders the same markup as
+    Select, "App | Model" optgroups included, but builds it as a string
+    rather than rendering a template per option, which takes seconds once
+    there are tens of thousands of choices. With a choices cache, the
+    rendered optgroup of each target is cached too, so only the selected
+    option is marked at render time.
+    """
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        if self.allow_multiple_selected:
+            attrs["multiple"] = True
+        return mark_safe(
+            format_html('<select name="{}"{}>', name, flatatt(attrs))
+            + self.select_options(
+                self.render_options(), self.format_value(value)
+            )
+            + "\n</select>"
+        )
+
+    def use_required_attribute(self, initial):
+        # the choices of a GenericFKField always start with an optgroup, so
+        # the required attribute is never used, and looking for an empty
+        # first choice would load every choice
+        if getattr(self.choices, "field", None) is not None:
+            return False
+        return super().use_required_attribute(initial)
+
+    def get_choices_cache(self):
+        # only the choices of a GenericFKField, iterated through its
+        # GenericFKChoiceIterator, are cached
+        field = getattr(self.choices, "field", None)
+        return getattr(field, "choices_cache", None)
+
+    def render_options(self):
+        """
+        Return the html of the optgroups and options, none of them selected.
+        """
+        choices_cache = self.get_choices_cache()
+        if choices_cache is not None:
+            return self.render_cached_optgroups(choices_cache)
+
+        html = []
+        for option_value, option_label in self.choices:
+            if option_value is None:
+                option_value = ""
+            if isinstance(option_label, (list, tuple)):
+                html.append(self.render_optgroup(option_value, option_label))
+            else:
+                html.append(self.render_option(option_value, option_label))
+        return "".join(html)
+
+    def render_cached_optgroups(self, choices_cache):
+        """
+        Return the html of the optgroup of each target, rendered once per
+        generation of the target model and shared through the choices
+        cache.
+        """
+        iterator = self.choices
+        targets = iterator.field.get_targets()
+        keys = choices_cache.get_keys(targets, key_format=OPTGROUP_KEY)
+        optgroups = choices_cache.get_many(keys)
+        missing_targets = [t for t in targets if t not in optgroups]
+        if missing_targets:
+            rendered = {
+                target: self.render_optgroup(target.group_label, choices)
+                for target, choices in iterator.iter_target_choices(
+                    missing_targets
+                )
+            }
+            choices_cache.set_many(keys, rendered)
+            optgroups.update(rendered)
+        return "".join(optgroups[target] for target in targets)
+
+    def render_optgroup(self, group_name, choices):
+        options = "".join(
+            self.render_option(option_value, option_label)
+            for option_value, option_label in choices
+        )
+        if not group_name:
+            return options
+        return "%s%s\n  </optgroup>" % (
+            format_html('\n  <optgroup label="{}">', group_name),
+            options,
+        )
+
+    def render_option(self, value, label):
+        return '\n  <option value="%s">%s</option>\n' % (
+            conditional_escape(str(value)),
+            conditional_escape(label),
+        )
+
+    def select_options(self, html, value):
+        """
+        Mark the options in value as selected. Like Select, only the first
+        matching option is selected unless multiple options are allowed.
+        """
+        for option_value in value:
+            option = '<option value="%s">' % conditional_escape(option_value)
+            if option not in html:
+                continue
+            html = html.replace(
+                option,
+                '<option value="%s" selected>'
+                % conditional_escape(option_value),
+                -1 if self.allow_multiple_selected else 1,
+            )
+            if not self.allow_multiple_selected:
+                break
+        return html
+
+
+class GenericFKAutocompleteSelect(forms.Select):
+    """
+    A Select widget for GenericFKField that searches the generic targets via
+    GenericFKAdmin's autocomplete view instead of rendering every choice.
+    Only the selected option is rendered.
+    """
+
+    def __init__(self, url, attrs=None, choices=()):
+        super().__init__(attrs, choices)
+        self.url = url
+        self.i18n_name = get_select2_language()
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        """
+        Set select2's AJAX attributes using html5 data attributes.
+        """
+        attrs = super().build_attrs(base_attrs, extra_attrs=extra_attrs)
+        attrs.setdefault("class", "")
+        attrs.update(
+            {
+                "data-ajax--cache": "true",
+                "data-ajax--delay": 250,
+                "data-ajax--type": "GET",
+                "data-ajax--url": self.url,
+                "data-theme": "admin-autocomplete",
+                "data-allow-clear": json.dumps(not self.is_required),
+                "data-placeholder": "",  # Allows clearing of the input.
+                "lang": self.i18n_name,
+                "class": attrs["class"]
+                + (" " if attrs["class"] else "")
+                + "admin-generic-autocomplete",
+            }
+        )
+        return attrs
+
+    def use_required_attribute(self, initial):
+        # Select looks for an empty first choice, which would load every
+        # candidate. Only the selected option is rendered, and the empty
+        # option only when the field isn't required, so it's never a
+        # placeholder
+        return False
+
+    def optgroups(self, name, value, attrs=None):
+        """
+        Return only the selected option, resolving its label from the
+        target instance rather than the full set of choices.
+        """
+        default = (None, [], 0)
+        groups = [default]
+        if not self.is_required:
+            default[1].append(self.create_option(name, "", "", False, 0))
+        for option_value in value:
+            if option_value in ("", None):
+                continue
+            label = self.get_selected_label(option_value)
+            if label is None:
+                continue
+            default[1].append(
+                self.create_option(
+                    name,
+                    option_value,
+                    label,
+                    True,
+                    len(default[1]),
+                )
+            )
+        return groups
+
+    def get_selected_label(self, value):
+        """
+        Return the label of the target identified by value, built by its
+        GenericTarget the same way as the autocomplete results, or None if
+        the value can't be resolved.
+        """
+        try:
+            content_type, pk = parse_target_content_type(value)
+        except (ValueError, ObjectDoesNotExist):
+            return None
+        target_model = content_type.model_class()
+        if target_model is None:
+            return None
+
+        field = getattr(self.choices, "field", None)
+        target = field.get_target(target_model) if field is not None else None
+        if target is None:
+            target = GenericTarget(target_model)
+        try:
+            queryset = target.apply_hints(
+                target.model._default_manager.filter(pk=pk)
+            )
+            for _, label, _ in target.iter_choices(queryset):
+                return label
+        except (ValueError, ValidationError):
+            pass
+        return None
+
+    @property
+    def media(self):
+        extra = "" if settings.DEBUG else ".min"
+        i18n_file = (
+            ("admin/js/vendor/select2/i18n/%s.js" % self.i18n_name,)
+            if self.i18n_name
+            else ()
+        )
+        return forms.Media(
+            js=(
+                "admin/js/vendor/jquery/jquery%s.js" % extra,
+                "admin/js/vendor/select2/select2.full%s.js" % extra,
+            )
+            + i18n_file
+            + (
+                "admin/js/jquery.init.js",
+                "genfkadmin/js/autocomplete.js",
+            ),
+            css={
+                "screen": (
+                    "admin/css/vendor/select2/select2%s.css" % extra,
+                    "admin/css/autocomplete.css",
+                ),
+            },
+        )
+
+
+__all__ = [
+    "GenericFKAutocompleteSelect",
+    "GenericFKSelect",
+]
@@ -40,6 +40,7 @@ def pytest_configure():
             "django.contrib.sessions",
             "django.contrib.sites",
             "django.contrib.staticfiles",
+            "genfkadmin",
             "tests",
         ),
         PASSWORD_HASHERS=("django.contrib.auth.hashers.MD5PasswordHasher",),
@@ -31,6 +31,7 @@ class Pet(models.Model):
 
 class Dog(models.Model):
     name = models.CharField(max_length=256)
+    nickname = models.CharField(max_length=256, null=True, blank=True)
     tags = GenericRelation(Pet)
 
     class Meta:
@@ -1,16 +1,31 @@
+import base64
+import json
 from unittest.mock import MagicMock
 
 import pytest
 from django import forms
 from django.contrib import admin
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from genfkadmin import FIELD_ID_FORMAT
 from genfkadmin.admin import GenericFKAdmin
 from genfkadmin.forms import GenericFKModelForm
-from tests.factories import DogFactory, PetFactory
-from tests.models import GenreA, GenreB, MarketingMaterial, Pet
+from genfkadmin.targets import get_generic_targets
+from genfkadmin.widgets import GenericFKAutocompleteSelect
+from tests.factories import DogFactory, PetFactory, UserFactory
+from tests.models import (
+    EmailDeliveryMechanism,
+    GenreA,
+    GenreB,
+    MarketingMaterial,
+    Pet,
+    SMSDeliveryMechanism,
+)
 
 
 class BadForm(forms.ModelForm):
@@ -162,6 +177,311 @@ def test_admin_renders_add(client, admin_user):
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+def test_admin_changelist_batches_generic_targets(
+    client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    pet_admin = site._registry[Pet]
+    monkeypatch.setattr(
+        pet_admin, "list_display", ("pk", "content_object_gfk")
+    )
+    # Pet.__str__ also shows the owner
+    monkeypatch.setattr(pet_admin, "list_select_related", ("owner",))
+    client.force_login(admin_user)
+    url = reverse("admin:tests_pet_changelist")
+
+    def count_queries():
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(context.captured_queries), response.content.decode()
+
+    dogs = [DogFactory() for _ in range(2)]
+    for dog in dogs:
+        PetFactory(owner=admin_user, content_object=dog)
+    # warm ContentType's cache
+    count_queries()
+    num_queries, _ = count_queries()
+
+    # more rows don't mean more queries, a query per target model is used
+    more_dogs = [DogFactory() for _ in range(3)]
+    for dog in more_dogs:
+        PetFactory(owner=admin_user, content_object=dog)
+    more_num_queries, content = count_queries()
+    assert more_num_queries == num_queries
+
+    assert "column-content_object_gfk" in content
+    for dog in dogs + more_dogs:
+        assert f">{dog}</" in content
+
+
+@pytest.mark.django_db
+def test_admin_changelist_prefetches_displayed_targets_only(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    client.force_login(admin_user)
+    url = reverse("admin:tests_marketingmaterial_changelist")
+
+    def get_target_queries():
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if "deliverymechanism" in query["sql"]
+        ]
+
+    # neither list_display nor __str__ shows the target
+    assert get_target_queries() == []
+
+    monkeypatch.setattr(
+        site._registry[MarketingMaterial],
+        "generic_prefetch_fields",
+        ("delivery_method",),
+    )
+    assert len(get_target_queries()) == 2
+
+
+@pytest.mark.django_db
+def test_admin_changelist_searches_generic_targets(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    material_admin = site._registry[MarketingMaterial]
+    monkeypatch.setattr(
+        material_admin, "generic_search_fields", ("delivery_method",)
+    )
+    monkeypatch.setattr(
+        material_admin,
+        "targets",
+        get_generic_targets(
+            MarketingMaterial,
+            {
+                "tests.EmailDeliveryMechanism": {"search_fields": ["value"]},
+                "tests.SMSDeliveryMechanism": {"search_fields": ["value"]},
+            },
+        ),
+    )
+    client.force_login(admin_user)
+    url = reverse("admin:tests_marketingmaterial_changelist")
+
+    m1 = marketing_materials["marketing_materials"]["m1"]["instance"]
+    m2 = marketing_materials["marketing_materials"]["m2"]["instance"]
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, {"q": m1.delivery_method.value})
+    assert response.status_code == 200
+    assert list(response.context["cl"].result_list) == [m1]
+    # the search box is shown without any search_fields
+    assert 'id="searchbar"' in response.content.decode()
+    # the targets are searched in subqueries rather than joined
+    search_queries = [
+        query["sql"]
+        for query in context.captured_queries
+        if "tests_marketingmaterial" in query["sql"]
+        and "deliverymechanism" in query["sql"]
+    ]
+    assert search_queries
+    for sql in search_queries:
+        assert " JOIN " not in sql.split(" WHERE ")[0]
+
+    response = client.get(url, {"q": m2.delivery_method.value})
+    assert list(response.context["cl"].result_list) == [m2]
+
+    response = client.get(url, {"q": "no such delivery method"})
+    assert list(response.context["cl"].result_list) == []
+
+
+@pytest.mark.django_db
+def test_admin_changelist_sorts_by_generic_target_label(
+    client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    from tests.factories import (
+        CustomerFactory,
+        EmailDeliveryMechanismFactory,
+        MarketingMaterialFactory,
+        SMSDeliveryMechanismFactory,
+    )
+
+    material_admin = site._registry[MarketingMaterial]
+    monkeypatch.setattr(
+        material_admin, "list_display", ("title", "delivery_method_gfk")
+    )
+    monkeypatch.setattr(
+        material_admin,
+        "targets",
+        get_generic_targets(
+            MarketingMaterial,
+            {
+                "tests.EmailDeliveryMechanism": {"label_fields": ["value"]},
+                "tests.SMSDeliveryMechanism": {"label_fields": ["value"]},
+            },
+        ),
+    )
+    monkeypatch.setattr(
+        material_admin,
+        "delivery_method_gfk",
+        material_admin.get_generic_field_display("delivery_method_gfk"),
+    )
+    customer = CustomerFactory()
+    materials = [
+        MarketingMaterialFactory(
+            customer=customer,
+            delivery_method=factory(customer=customer, value=value),
+        )
+        for factory, value in (
+            (EmailDeliveryMechanismFactory, "b@example.com"),
+            (SMSDeliveryMechanismFactory, "555-0100"),
+            (EmailDeliveryMechanismFactory, "c@example.com"),
+            (SMSDeliveryMechanismFactory, "a-555-0199"),
+        )
+    ]
+    client.force_login(admin_user)
+    url = reverse("admin:tests_marketingmaterial_changelist")
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, {"o": "2"})
+    assert response.status_code == 200
+    assert list(response.context["cl"].result_list) == [
+        materials[1],
+        materials[3],
+        materials[0],
+        materials[2],
+    ]
+    # the column is sortable, and sorted in the database
+    assert "sortable column-delivery_method_gfk sorted ascending" in (
+        response.content.decode()
+    )
+    assert any(
+        "ORDER BY CASE WHEN" in query["sql"]
+        for query in context.captured_queries
+    )
+
+    response = client.get(url, {"o": "-2"})
+    assert list(response.context["cl"].result_list) == [
+        materials[2],
+        materials[0],
+        materials[3],
+        materials[1],
+    ]
+
+
+@pytest.mark.django_db
+def test_admin_changelist_unsortable_without_label_fields(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    material_admin = site._registry[MarketingMaterial]
+    monkeypatch.setattr(
+        material_admin, "list_display", ("title", "delivery_method_gfk")
+    )
+    client.force_login(admin_user)
+    url = reverse("admin:tests_marketingmaterial_changelist")
+
+    # the default targets are labelled with __str__, which can't be sorted
+    # in the database
+    response = client.get(url, {"o": "2"})
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert "column-delivery_method_gfk" in content
+    assert "sortable column-delivery_method_gfk" not in content
+    assert not hasattr(material_admin.delivery_method_gfk, "admin_order_field")
+
+
+@pytest.mark.django_db
+def test_admin_reassign_generic_target_action(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from django.contrib.admin import helpers, site
+
+    monkeypatch.setattr(
+        site._registry[MarketingMaterial],
+        "actions",
+        ["reassign_generic_target"],
+    )
+    client.force_login(admin_user)
+    url = reverse("admin:tests_marketingmaterial_changelist")
+
+    m1 = marketing_materials["marketing_materials"]["m1"]["instance"]
+    m2 = marketing_materials["marketing_materials"]["m2"]["instance"]
+    e4 = marketing_materials["email"]["e4"]
+    data = {
+        "action": "reassign_generic_target",
+        helpers.ACTION_CHECKBOX_NAME: [m1.pk, m2.pk],
+    }
+
+    # the target is picked on an intermediate page
+    response = client.post(url, {**data, "index": 0})
+    assert response.status_code == 200
+    assert response.context["count"] == 2
+    content = response.content.decode()
+    assert 'name="target"' in content
+    assert 'name="post" value="yes"' in content
+
+    # an unknown target is rejected and nothing is updated
+    response = client.post(
+        url,
+        {
+            **data,
+            "post": "yes",
+            "generic_field": "delivery_method_gfk",
+            "target": FIELD_ID_FORMAT.format(
+                app_label="tests",
+                model_name="emaildeliverymechanism",
+                pk=0,
+            ),
+        },
+    )
+    assert response.status_code == 200
+    assert response.context["form"].errors["target"]
+    m1.refresh_from_db()
+    assert m1.delivery_method == marketing_materials["sms"]["sms1"]
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(
+            url,
+            {
+                **data,
+                "post": "yes",
+                "generic_field": "delivery_method_gfk",
+                "target": FIELD_ID_FORMAT.format(
+                    app_label="tests",
+                    model_name="emaildeliverymechanism",
+                    pk=e4.pk,
+                ),
+            },
+        )
+    assert response.status_code == 302
+    # the rows are updated with a single UPDATE, without saving each one
+    updates = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith('UPDATE "tests_marketingmaterial"')
+    ]
+    assert len(updates) == 1
+    for material in (m1, m2):
+        material.refresh_from_db()
+        assert material.delivery_method == e4
+
+
+def test_admin_generic_search_fields_must_be_generic():
+    from django.contrib.admin import site
+
+    class BadSearchAdmin(GenericFKAdmin):
+        generic_search_fields = ("customer",)
+
+    with pytest.raises(ImproperlyConfigured):
+        BadSearchAdmin(MarketingMaterial, site)
+
+
 @admin.register(MarketingMaterial)
 class MarketingMaterialAdmin(GenericFKAdmin):
     def filter_callback(self, obj=None, queryset=None):
@@ -297,13 +617,504 @@ def test_admin_with_fieldsets():
 
     admin = GenreFieldsetAdmin(GenreB, site)
     fields = admin.get_fieldsets()
-    assert fields == [
-        (None, {"fields": ["name"]}),
+    assert fields == (
+        (None, {"fields": ("name",)}),
         (
             "Type",
             {
-                "classes": ["collapse"],
-                "fields": ["media_gfk"],
+                "classes": ("collapse",),
+                "fields": ("media_gfk",),
             },
         ),
+    )
+
+
+def test_admin_field_layout_computed_once():
+    from django.contrib.admin import site
+
+    admin = GenreFieldsetAdmin(GenreB, site)
+    fieldsets = admin.get_fieldsets()
+    assert admin.get_fieldsets() is fieldsets
+    with pytest.raises(TypeError):
+        fieldsets[0][1]["fields"] = ()
+
+    # changing the declared fieldsets computes them again
+    admin.fieldsets = [(None, {"fields": ["name", "ct", "ob"]})]
+    assert admin.get_fieldsets() == (
+        (None, {"fields": ("name", "media_gfk")}),
+    )
+
+    admin = GenericFKAdmin(GenreB, site)
+    fields = admin.get_fields(MagicMock())
+    assert fields == ("name", "media_gfk")
+    assert admin.get_fields(MagicMock()) is fields
+
+
+@pytest.mark.django_db
+def test_admin_get_form_issues_no_queries(
+    marketing_materials, django_assert_num_queries
+):
+    from django.contrib.admin import site
+
+    with django_assert_num_queries(0):
+        admin = MarketingMaterialAdmin(MarketingMaterial, site)
+        admin.get_form(
+            MagicMock(),
+            obj=marketing_materials["marketing_materials"]["m1"]["instance"],
+        )
+
+
+@pytest.mark.django_db
+def test_admin_get_form_caches_form_class(marketing_materials):
+    from django.contrib.admin import site
+
+    admin = MarketingMaterialAdmin(MarketingMaterial, site)
+    admin.form_cache_size = 128
+    request = MagicMock()
+    m1 = marketing_materials["marketing_materials"]["m1"]["instance"]
+    m2 = marketing_materials["marketing_materials"]["m2"]["instance"]
+
+    form = admin.get_form(request, obj=m1)
+    # get_form returns a subclass of the cached class
+    form_class = form.__base__
+    assert admin.get_form(request, obj=m1).__base__ is form_class
+    assert admin.get_form(MagicMock(), obj=m1).__base__ is not form_class
+    assert len(admin.form_cache) == 2
+
+    # the cached fields are filtered by the new obj
+    m2_form = admin.get_form(request, obj=m2)
+    assert m2_form.__base__ is form_class
+    expected_choices = [
+        FIELD_ID_FORMAT.format(
+            app_label="tests",
+            model_name=mechanism.__class__.__name__.lower(),
+            pk=mechanism.pk,
+        )
+        for mechanism in marketing_materials["marketing_materials"]["m2"][
+            "options"
+        ]
+    ]
+    assert expected_choices == [
+        value
+        for _, choices in m2_form().fields["delivery_method_gfk"].choices
+        for value, _ in choices
+    ]
+
+
+@pytest.mark.django_db
+def test_admin_get_form_cache_respects_get_exclude(pets):
+    from django.contrib.admin import site
+
+    class ExcludingPetAdmin(GenericFKAdmin):
+        def get_exclude(self, request, obj=None):
+            if obj is not None and obj.owner.username == "o1":
+                return ("owner",)
+            return super().get_exclude(request, obj)
+
+    admin = ExcludingPetAdmin(Pet, site)
+    admin.form_cache_size = 128
+    request = MagicMock()
+    o1_pet = Pet.objects.filter(owner__username="o1").first()
+    o2_pet = Pet.objects.filter(owner__username="o2").first()
+
+    assert list(admin.get_form(request, obj=o2_pet).base_fields) == [
+        "owner",
+        "content_object_gfk",
+    ]
+    assert list(admin.get_form(request, obj=o1_pet).base_fields) == [
+        "content_object_gfk",
     ]
+    assert len(admin.form_cache) == 2
+
+
+@pytest.mark.django_db
+def test_admin_get_form_binds_filter_callback_per_form(marketing_materials):
+    from django.contrib.admin import site
+
+    admin = MarketingMaterialAdmin(MarketingMaterial, site)
+    request = MagicMock()
+    m1 = marketing_materials["marketing_materials"]["m1"]["instance"]
+    m2 = marketing_materials["marketing_materials"]["m2"]["instance"]
+
+    # build both form classes before using either, as concurrent requests
+    # would, the shared class is left untouched
+    m1_form = admin.get_form(request, obj=m1)
+    m2_form = admin.get_form(request, obj=m2)
+    form_class = m1_form.__base__
+    assert (
+        form_class.base_fields["delivery_method_gfk"].filter_callback is None
+    )
+
+    for obj, form in ((m1, m1_form), (m2, m2_form)):
+        filter_callback = form().fields["delivery_method_gfk"].filter_callback
+        assert filter_callback.keywords == {"obj": obj}
+
+
+@pytest.mark.django_db
+def test_admin_get_form_cache_size():
+    from django.contrib.admin import site
+
+    admin = GoodAdminConfiguration(Pet, site)
+    admin.form_cache_size = 1
+    request = MagicMock()
+
+    form = admin.get_form(request)
+    admin.get_form(MagicMock())
+    assert len(admin.form_cache) == 1
+    assert admin.get_form(request).__base__ is not form.__base__
+
+    # the cache is off by default
+    admin.form_cache_size = GenericFKAdmin.form_cache_size
+    assert (
+        admin.get_form(request).__base__
+        is not admin.get_form(request).__base__
+    )
+
+
+@pytest.mark.django_db
+def test_admin_get_form_cache_key_covers_autocomplete_fields():
+    from django.contrib.admin import site
+
+    admin = MarketingMaterialAdmin(MarketingMaterial, site)
+    admin.form_cache_size = 128
+    request = MagicMock()
+
+    form = admin.get_form(request)
+    admin.generic_autocomplete_fields = ("delivery_method",)
+    autocomplete_form = admin.get_form(request)
+    assert autocomplete_form.__base__ is not form.__base__
+    assert isinstance(
+        autocomplete_form.base_fields["delivery_method_gfk"].widget,
+        GenericFKAutocompleteSelect,
+    )
+
+
+@pytest.mark.django_db
+def test_admin_view_only_displays_target(marketing_materials, client):
+    user = UserFactory(is_staff=True)
+    user.user_permissions.add(
+        Permission.objects.get(codename="view_marketingmaterial")
+    )
+    client.force_login(user)
+    instance = marketing_materials["marketing_materials"]["m1"]["instance"]
+    sms = marketing_materials["sms"]["sms1"]
+
+    url = reverse(
+        "admin:tests_marketingmaterial_change",
+        kwargs={"object_id": instance.pk},
+    )
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+
+    content = response.content.decode()
+    assert f'<div class="readonly">{sms}</div>' in content
+    assert "<select" not in content
+    # only the current target is fetched, by its primary key
+    target_queries = [
+        query["sql"]
+        for query in context.captured_queries
+        if "deliverymechanism" in query["sql"]
+    ]
+    assert len(target_queries) == 1
+    assert f'."id" = {sms.pk}' in target_queries[0]
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_view(
+    marketing_materials, client, admin_user
+):
+    client.force_login(admin_user)
+
+    instance = marketing_materials["marketing_materials"]["m1"]["instance"]
+    url = reverse(
+        "admin:tests_marketingmaterial_generic_autocomplete",
+        kwargs={"field_name": "delivery_method_gfk"},
+    )
+    response = client.get(url, {"object_id": instance.pk})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [group["text"] for group in data["results"]] == [
+        "Tests | EmailDeliveryMechanism",
+        "Tests | SMSDeliveryMechanism",
+    ]
+    assert [
+        child["id"] for group in data["results"] for child in group["children"]
+    ] == [
+        FIELD_ID_FORMAT.format(
+            app_label="tests",
+            model_name=mechanism.__class__.__name__.lower(),
+            pk=mechanism.pk,
+        )
+        for mechanism in marketing_materials["marketing_materials"]["m1"][
+            "options"
+        ]
+    ]
+    assert data["pagination"] == {"more": False, "next": None}
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_view_paginates_across_targets(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from genfkadmin.views import GenericFKAutocompleteJsonView
+
+    monkeypatch.setattr(GenericFKAutocompleteJsonView, "paginate_by", 3)
+    client.force_login(admin_user)
+
+    url = reverse(
+        "admin:tests_marketingmaterial_generic_autocomplete",
+        kwargs={"field_name": "delivery_method_gfk"},
+    )
+    pages = []
+    params = {}
+    while True:
+        data = client.get(url, params).json()
+        pages.append(
+            [
+                child["id"]
+                for group in data["results"]
+                for child in group["children"]
+            ]
+        )
+        if not data["pagination"]["more"]:
+            assert data["pagination"]["next"] is None
+            break
+        params["cursor"] = data["pagination"]["next"]
+
+    # 4 email + 4 sms mechanisms split into pages of 3
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert len(set(sum(pages, []))) == 8
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_view_unknown_field(client, admin_user):
+    client.force_login(admin_user)
+
+    url = reverse(
+        "admin:tests_marketingmaterial_generic_autocomplete",
+        kwargs={"field_name": "customer"},
+    )
+    assert client.get(url).status_code == 404
+
+
+def test_admin_generic_autocomplete_fields_must_be_generic():
+    from django.contrib.admin import site
+
+    class BadAutocompleteAdmin(GenericFKAdmin):
+        generic_autocomplete_fields = ("customer",)
+
+    with pytest.raises(ImproperlyConfigured):
+        BadAutocompleteAdmin(MarketingMaterial, site)
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_widget_renders_selected_only(
+    marketing_materials,
+):
+    from django.contrib.admin import site
+
+    class AutocompleteAdmin(MarketingMaterialAdmin):
+        generic_autocomplete_fields = ("delivery_method",)
+
+    instance = marketing_materials["marketing_materials"]["m1"]["instance"]
+    admin = AutocompleteAdmin(MarketingMaterial, site)
+    form = admin.get_form(MagicMock(), obj=instance)(instance=instance)
+
+    rendered = str(form["delivery_method_gfk"])
+
+    assert 'class="admin-generic-autocomplete"' in rendered
+    assert f'data-object-id="{instance.pk}"' in rendered
+    assert rendered.count("<option") == 1
+    assert (
+        FIELD_ID_FORMAT.format(
+            app_label="tests",
+            model_name="smsdeliverymechanism",
+            pk=marketing_materials["sms"]["sms1"].pk,
+        )
+        in rendered
+    )
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_widget_labels_with_target(
+    marketing_materials, django_assert_num_queries
+):
+    from django.contrib.admin import site
+
+    class AutocompleteAdmin(MarketingMaterialAdmin):
+        generic_autocomplete_fields = ("delivery_method",)
+        generic_targets = {
+            "tests.SMSDeliveryMechanism": {"label_fields": ["value"]},
+        }
+
+    instance = marketing_materials["marketing_materials"]["m1"]["instance"]
+    admin = AutocompleteAdmin(MarketingMaterial, site)
+    form = admin.get_form(MagicMock(), obj=instance)(instance=instance)
+    sms1 = marketing_materials["sms"]["sms1"]
+    # warm ContentType's cache
+    ContentType.objects.get_for_model(SMSDeliveryMechanism)
+
+    # the selected option is labelled like the autocomplete results, from
+    # the label_fields alone rather than __str__, which reads the customer,
+    # and none of the candidates are loaded
+    with django_assert_num_queries(1):
+        rendered = str(form["delivery_method_gfk"])
+    assert f">{sms1.value}</option>" in rendered
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_change_page_loads_no_candidates(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    monkeypatch.setattr(
+        site._registry[MarketingMaterial],
+        "generic_autocomplete_fields",
+        ("delivery_method",),
+    )
+    client.force_login(admin_user)
+    instance = marketing_materials["marketing_materials"]["m1"]["instance"]
+    url = reverse("admin:tests_marketingmaterial_change", args=[instance.pk])
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    # only the selected SMSDeliveryMechanism is read, for its label
+    target_queries = [
+        query["sql"]
+        for query in context.captured_queries
+        if "deliverymechanism" in query["sql"]
+    ]
+    assert len(target_queries) == 1
+    assert "tests_smsdeliverymechanism" in target_queries[0]
+    assert " WHERE " in target_queries[0]
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_view_generic_targets(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    monkeypatch.setattr(
+        site._registry[MarketingMaterial],
+        "targets",
+        get_generic_targets(
+            MarketingMaterial,
+            {
+                "tests.EmailDeliveryMechanism": {
+                    "search_fields": ["^value"],
+                    "ordering": ["-value"],
+                    "label_fields": ["value"],
+                },
+            },
+        ),
+    )
+    client.force_login(admin_user)
+
+    email = marketing_materials["email"]["e2"]
+    url = reverse(
+        "admin:tests_marketingmaterial_generic_autocomplete",
+        kwargs={"field_name": "delivery_method_gfk"},
+    )
+    data = client.get(url, {"term": email.value[:-1]}).json()
+
+    # SMSDeliveryMechanism has no search_fields so is left out
+    assert data["results"] == [
+        {
+            "text": "Tests | EmailDeliveryMechanism",
+            "children": [
+                {
+                    "id": FIELD_ID_FORMAT.format(
+                        app_label="tests",
+                        model_name="emaildeliverymechanism",
+                        pk=email.pk,
+                    ),
+                    "text": email.value,
+                }
+            ],
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_view_seeks_with_ordering(
+    marketing_materials, client, admin_user, monkeypatch
+):
+    from django.contrib.admin import site
+
+    from genfkadmin.views import GenericFKAutocompleteJsonView
+
+    monkeypatch.setattr(GenericFKAutocompleteJsonView, "paginate_by", 3)
+    monkeypatch.setattr(
+        site._registry[MarketingMaterial],
+        "targets",
+        get_generic_targets(
+            MarketingMaterial,
+            {
+                "tests.EmailDeliveryMechanism": {"ordering": ["-value"]},
+                "tests.SMSDeliveryMechanism": {"ordering": ["customer__name"]},
+            },
+        ),
+    )
+    client.force_login(admin_user)
+
+    url = reverse(
+        "admin:tests_marketingmaterial_generic_autocomplete",
+        kwargs={"field_name": "delivery_method_gfk"},
+    )
+    first_page = client.get(url).json()
+    second_page = client.get(
+        url, {"cursor": first_page["pagination"]["next"]}
+    ).json()
+
+    emails = sorted(
+        marketing_materials["email"].values(),
+        key=lambda email: email.value,
+        reverse=True,
+    )
+    assert [child["id"] for child in first_page["results"][0]["children"]] == [
+        FIELD_ID_FORMAT.format(
+            app_label="tests",
+            model_name="emaildeliverymechanism",
+            pk=email.pk,
+        )
+        for email in emails[:3]
+    ]
+    # the second page picks up where the first left off and continues into
+    # the next target
+    assert [group["text"] for group in second_page["results"]] == [
+        "Tests | EmailDeliveryMechanism",
+        "Tests | SMSDeliveryMechanism",
+    ]
+    assert second_page["results"][0]["children"][0]["id"] == (
+        FIELD_ID_FORMAT.format(
+            app_label="tests",
+            model_name="emaildeliverymechanism",
+            pk=emails[3].pk,
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_admin_generic_autocomplete_view_invalid_cursor(client, admin_user):
+    client.force_login(admin_user)
+
+    url = reverse(
+        "admin:tests_marketingmaterial_generic_autocomplete",
+        kwargs={"field_name": "delivery_method_gfk"},
+    )
+    assert client.get(url, {"cursor": "not a cursor"}).status_code == 400
+
+    # well formed cursors with a key that doesn't fit the ordering
+    content_type_id = ContentType.objects.get_for_model(
+        EmailDeliveryMechanism
+    ).id
+    for key in (5, ["x"], [1, 2], [None]):
+        cursor = base64.urlsafe_b64encode(
+            json.dumps([content_type_id, key]).encode()
+        ).decode()
+        assert client.get(url, {"cursor": cursor}).status_code == 400
@@ -0,0 +1,220 @@
+from unittest.mock import MagicMock
+
+import pytest
+from django import forms
+from django.core.cache import cache, caches
+
+from genfkadmin.admin import GenericFKAdmin
+from genfkadmin.cache import CHOICES_KEY, GenericChoicesCache, watch_model
+from genfkadmin.fields import GenericFKField
+from genfkadmin.targets import get_target_value
+from tests.factories import DogFactory
+from tests.models import Cat, Dog, MarketingMaterial, Pet
+
+CHOICES_PREFIX = CHOICES_KEY.split("{")[0]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_cached_choices_are_reused(pets, django_assert_num_queries):
+    watch_model(Dog)
+    watch_model(Cat)
+
+    field = GenericFKField(Pet, choices_cache=GenericChoicesCache("pets"))
+    with django_assert_num_queries(2):
+        choices = list(field.choices)
+
+    field = GenericFKField(Pet, choices_cache=GenericChoicesCache("pets"))
+    with django_assert_num_queries(0):
+        assert list(field.choices) == choices
+
+
+@pytest.mark.django_db
+def test_cached_choices_keyed(pets, django_assert_num_queries):
+    list(GenericFKField(Pet, choices_cache=GenericChoicesCache("a")).choices)
+
+    field = GenericFKField(Pet, choices_cache=GenericChoicesCache("b"))
+    with django_assert_num_queries(2):
+        list(field.choices)
+
+
+@pytest.mark.django_db
+def test_cached_choices_invalidated_on_save_and_delete(
+    pets, django_assert_num_queries
+):
+    watch_model(Dog)
+    watch_model(Cat)
+    list(
+        GenericFKField(Pet, choices_cache=GenericChoicesCache("pets")).choices
+    )
+
+    dog = DogFactory()
+    field = GenericFKField(Pet, choices_cache=GenericChoicesCache("pets"))
+    # only the dogs are loaded again
+    with django_assert_num_queries(1):
+        (_, dogs), (_, cats) = field.choices
+    assert str(dog) in [label for _, label in dogs]
+
+    dog.delete()
+    field = GenericFKField(Pet, choices_cache=GenericChoicesCache("pets"))
+    with django_assert_num_queries(1):
+        (_, dogs), (_, cats) = field.choices
+    assert str(dog) not in [label for _, label in dogs]
+
+
+@pytest.mark.django_db
+def test_admin_choices_cache(marketing_materials, django_assert_num_queries):
+    from django.contrib.admin import site
+
+    class CachedMarketingMaterialAdmin(GenericFKAdmin):
+        generic_choices_cache = "default"
+
+        def filter_callback(self, obj=None, queryset=None):
+            if obj:
+                return queryset.filter(customer=obj.customer)
+            return queryset
+
+    admin = CachedMarketingMaterialAdmin(MarketingMaterial, site)
+    m1 = marketing_materials["marketing_materials"]["m1"]["instance"]
+    m2 = marketing_materials["marketing_materials"]["m2"]["instance"]
+
+    list(
+        admin.get_form(MagicMock(), obj=m1)()
+        .fields["delivery_method_gfk"]
+        .choices
+    )
+    with django_assert_num_queries(0):
+        m1_choices = list(
+            admin.get_form(MagicMock(), obj=m1)()
+            .fields["delivery_method_gfk"]
+            .choices
+        )
+
+    # the filter_callback depends on obj so m2 has its own choices
+    m2_choices = list(
+        admin.get_form(MagicMock(), obj=m2)()
+        .fields["delivery_method_gfk"]
+        .choices
+    )
+    assert m1_choices != m2_choices
+
+
+@pytest.mark.django_db
+def test_admin_choices_cache_follows_filter(marketing_materials):
+    from django.contrib.admin import site
+
+    class CachedMarketingMaterialAdmin(GenericFKAdmin):
+        generic_choices_cache = "default"
+
+        def filter_callback(self, obj=None, queryset=None):
+            if obj:
+                return queryset.filter(customer=obj.customer)
+            return queryset
+
+    admin = CachedMarketingMaterialAdmin(MarketingMaterial, site)
+    m1 = marketing_materials["marketing_materials"]["m1"]["instance"]
+
+    def render():
+        form = admin.get_form(MagicMock(), obj=m1)(instance=m1)
+        return str(form["delivery_method_gfk"])
+
+    for option in marketing_materials["marketing_materials"]["m1"]["options"]:
+        assert str(option) in render()
+
+    # the filter now selects another customer's targets, which aren't cached
+    m1.customer = marketing_materials["customer"]["c2"]
+    m1.save()
+    content = render()
+    for option in marketing_materials["marketing_materials"]["m2"]["options"]:
+        assert str(option) in content
+    for option in marketing_materials["marketing_materials"]["m1"]["options"]:
+        assert str(option) not in content
+
+
+@pytest.mark.django_db
+def test_admin_choices_cache_follows_related_labels(marketing_materials):
+    from django.contrib.admin import site
+
+    class CachedMarketingMaterialAdmin(GenericFKAdmin):
+        generic_choices_cache = "default"
+        generic_targets = {
+            model: {
+                "label_fields": ["value", "customer__name"],
+                "label_format": "{value} for {customer__name}",
+            }
+            for model in (
+                "tests.EmailDeliveryMechanism",
+                "tests.SMSDeliveryMechanism",
+            )
+        }
+
+    admin = CachedMarketingMaterialAdmin(MarketingMaterial, site)
+    m1 = marketing_materials["marketing_materials"]["m1"]["instance"]
+    customer = marketing_materials["customer"]["c1"]
+
+    def render():
+        form = admin.get_form(MagicMock(), obj=m1)(instance=m1)
+        return str(form["delivery_method_gfk"])
+
+    assert f"for {customer.name}</option>" in render()
+
+    # the labels are read from the customer, so renaming it drops them
+    customer.name = "Renamed Customer"
+    customer.save()
+    assert "for Renamed Customer</option>" in render()
+
+
+@pytest.mark.django_db
+def test_cached_optgroups_are_reused(
+    pets, django_assert_num_queries, monkeypatch
+):
+    watch_model(Dog)
+    watch_model(Cat)
+    dog, cat = pets["dogs"][0], pets["cats"][0]
+    dog_value = get_target_value(dog)
+    cat_value = get_target_value(cat)
+
+    def render(field, value):
+        # render through the BoundField, as the admin does
+        form_class = type(
+            "PetForm", (forms.Form,), {"content_object_gfk": field}
+        )
+        form = form_class(initial={"content_object_gfk": value})
+        return str(form["content_object_gfk"])
+
+    read_keys = []
+    get_many = caches["default"].get_many
+
+    def spy_get_many(keys, *args, **kwargs):
+        read_keys.extend(keys)
+        return get_many(keys, *args, **kwargs)
+
+    monkeypatch.setattr(caches["default"], "get_many", spy_get_many)
+
+    field = GenericFKField(Pet, choices_cache=GenericChoicesCache("pets"))
+    with django_assert_num_queries(2):
+        html = render(field, dog_value)
+    # the uncached widget renders the same markup
+    assert html == render(GenericFKField(Pet), dog_value)
+
+    read_keys.clear()
+    field = GenericFKField(Pet, choices_cache=GenericChoicesCache("pets"))
+    with django_assert_num_queries(0):
+        html = render(field, cat_value)
+    assert f'<option value="{cat_value}" selected>' in html
+    assert f'<option value="{dog_value}">' in html
+    # only the rendered optgroups are read, not the choices, and the
+    # generation of each target is read once
+    assert not [key for key in read_keys if key.startswith(CHOICES_PREFIX)]
+    assert len([key for key in read_keys if "generation" in key]) == 2
+
+    # only the dogs are rendered again
+    DogFactory()
+    with django_assert_num_queries(1):
+        render(field, cat_value)
@@ -1,9 +1,13 @@
+import copy
+
 import pytest
+from django.contrib.contenttypes.models import ContentType
 
 from genfkadmin import FIELD_ID_FORMAT
 from genfkadmin.fields import GenericFKField
+from genfkadmin.targets import get_generic_targets, get_target_value
 from tests.factories import ElephantFactory
-from tests.models import Pet
+from tests.models import Cat, Dog, Elephant, MarketingMaterial, Pet
 
 
 @pytest.mark.django_db
@@ -48,3 +52,192 @@ def test_field_choices_only_linked_models(pets):
 
     for value, display in field.choices:
         assert value not in elephant_choices
+
+
+@pytest.mark.django_db
+def test_field_choices_are_lazy(pets, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        field = GenericFKField(Pet)
+
+    # one query per GenericRelation target when the choices are iterated
+    with django_assert_num_queries(2):
+        choices = list(field.choices)
+    assert len(choices) == 2
+
+
+@pytest.mark.django_db
+def test_field_copy_does_not_load_choices(pets, django_assert_num_queries):
+    field = GenericFKField(Pet)
+    with django_assert_num_queries(0):
+        field_copy = copy.deepcopy(field)
+
+    assert field_copy.widget.choices.field is field_copy
+
+
+@pytest.mark.django_db
+def test_field_choices_use_targets(marketing_materials):
+    targets = get_generic_targets(
+        MarketingMaterial,
+        {
+            "tests.EmailDeliveryMechanism": {
+                "ordering": ["-pk"],
+                "label_fields": ["value"],
+            },
+        },
+    )
+    field = GenericFKField(MarketingMaterial, targets=targets)
+    emails, _ = field.choices
+
+    assert emails[1] == [
+        (
+            FIELD_ID_FORMAT.format(
+                app_label="tests",
+                model_name="emaildeliverymechanism",
+                pk=email.pk,
+            ),
+            email.value,
+        )
+        for email in sorted(
+            marketing_materials["email"].values(),
+            key=lambda email: email.pk,
+            reverse=True,
+        )
+    ]
+
+
+@pytest.mark.django_db
+def test_field_choices_label_fields_single_query_per_target(
+    marketing_materials, django_assert_num_queries
+):
+    label_options = {
+        "label_fields": ["value", "customer__name"],
+        "label_format": "{value} for {customer__name}",
+    }
+    targets = get_generic_targets(
+        MarketingMaterial,
+        {
+            "tests.EmailDeliveryMechanism": label_options,
+            "tests.SMSDeliveryMechanism": label_options,
+        },
+    )
+    field = GenericFKField(MarketingMaterial, targets=targets)
+
+    # str() of a DeliveryMechanism queries its customer, the label_fields
+    # are joined in instead
+    with django_assert_num_queries(2):
+        choices = list(field.choices)
+
+    assert dict(choices[0][1]) == {
+        FIELD_ID_FORMAT.format(
+            app_label="tests",
+            model_name="emaildeliverymechanism",
+            pk=email.pk,
+        ): str(email)
+        for email in marketing_materials["email"].values()
+    }
+
+
+@pytest.mark.django_db
+def test_field_choices_union(marketing_materials, django_assert_num_queries):
+    label_options = {
+        "label_fields": ["value", "customer__name"],
+        "label_format": "{value} for {customer__name}",
+    }
+    targets = get_generic_targets(
+        MarketingMaterial,
+        {
+            "tests.EmailDeliveryMechanism": {
+                "ordering": ["-value"],
+                **label_options,
+            },
+            "tests.SMSDeliveryMechanism": label_options,
+        },
+    )
+    expected_choices = list(
+        GenericFKField(MarketingMaterial, targets=targets).choices
+    )
+
+    field = GenericFKField(MarketingMaterial, targets=targets, union=True)
+    with django_assert_num_queries(1):
+        choices = list(field.choices)
+
+    assert choices == expected_choices
+
+
+@pytest.mark.django_db
+def test_field_choices_union_without_label_fields(
+    pets, django_assert_num_queries
+):
+    targets = get_generic_targets(
+        Pet, {"tests.Dog": {"label_fields": ["name"]}}
+    )
+    field = GenericFKField(Pet, targets=targets, union=True)
+
+    # Cat has no label_fields so needs its own query for __str__
+    with django_assert_num_queries(2):
+        (_, dogs), (_, cats) = field.choices
+
+    assert [label for _, label in dogs] == [dog.name for dog in pets["dogs"]]
+    assert [label for _, label in cats] == [str(cat) for cat in pets["cats"]]
+
+
+@pytest.mark.django_db
+def test_field_copies_share_choices(pets, django_assert_num_queries):
+    field = GenericFKField(Pet)
+    first_copy = copy.deepcopy(field)
+    second_copy = copy.deepcopy(first_copy)
+
+    with django_assert_num_queries(2):
+        choices = list(first_copy.choices)
+    with django_assert_num_queries(0):
+        assert list(second_copy.choices) == choices
+        assert list(first_copy.choices) == choices
+
+    # the copies read the same immutable choices
+    assert isinstance(choices[0][1], tuple)
+    assert list(second_copy.choices)[0] is choices[0]
+
+
+@pytest.mark.django_db
+def test_field_copy_with_other_options_loads_own_choices(
+    pets, django_assert_num_queries
+):
+    field = copy.deepcopy(GenericFKField(Pet))
+    field_copy = copy.deepcopy(field)
+    list(field.choices)
+
+    field_copy.filter_callback = lambda queryset: queryset.filter(pk=0)
+    with django_assert_num_queries(2):
+        assert [choices for _, choices in field_copy.choices] == [(), ()]
+
+    # the original copy keeps its choices
+    with django_assert_num_queries(0):
+        assert [choices for _, choices in field.choices] != [(), ()]
+
+
+@pytest.mark.django_db
+def test_field_validates_with_single_query(pets, django_assert_num_queries):
+    dog = pets["dogs"][0]
+    field = GenericFKField(
+        Pet, filter_callback=lambda queryset: queryset.exclude(pk=dog.pk)
+    )
+    # the ContentTypes come from ContentType's cache
+    ContentType.objects.get_for_models(Dog, Cat, Elephant)
+
+    with django_assert_num_queries(1):
+        assert field.clean(get_target_value(pets["dogs"][1]))
+    with django_assert_num_queries(1):
+        assert not field.valid_value(get_target_value(dog))
+    with django_assert_num_queries(0):
+        assert not field.valid_value("tests$dog[not a pk]")
+        assert not field.valid_value("tests$elephant[1]")
+        assert not field.valid_value("not a value")
+
+
+@pytest.mark.django_db
+def test_field_validate_choices(pets, django_assert_num_queries):
+    field = GenericFKField(Pet, validate_choices=True)
+
+    # every target's choices are loaded
+    with django_assert_num_queries(2):
+        assert field.valid_value(get_target_value(pets["cats"][0]))
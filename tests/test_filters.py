@@ -0,0 +1,92 @@
+import django
+import pytest
+from django.contrib.admin import AdminSite
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+
+from genfkadmin.admin import GenericFKAdmin
+from tests.models import Cat, Pet
+
+# the URLconf of these tests, pointed at the admin site of pet_admin
+urlpatterns = []
+
+
+class PetListFilterAdmin(GenericFKAdmin):
+    generic_list_filter = ("content_object",)
+
+
+@pytest.fixture
+def pet_admin(settings):
+    site = AdminSite()
+    site.register(Pet, PetListFilterAdmin)
+    urlpatterns[:] = [path("admin/", site.urls)]
+    settings.ROOT_URLCONF = __name__
+    return site._registry[Pet]
+
+
+@pytest.mark.skipif(
+    django.VERSION < (5, 0), reason="facets were added in Django 5.0"
+)
+@pytest.mark.django_db
+def test_list_filter_facet_counts(pets, pet_admin, client, admin_user):
+    client.force_login(admin_user)
+
+    url = reverse("admin:tests_pet_changelist")
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, {"_facets": "True"})
+    assert response.status_code == 200
+
+    content = response.content.decode()
+    assert "By Content Object" in content
+    assert "Tests | Dog (2)" in content
+    assert "Tests | Cat (2)" in content
+    # the content types of every target are counted in one query
+    count_queries = [
+        query["sql"]
+        for query in context.captured_queries
+        if "GROUP BY" in query["sql"]
+    ]
+    assert len(count_queries) == 1
+
+
+@pytest.mark.django_db
+def test_list_filter_filters_by_content_type(
+    pets, pet_admin, client, admin_user
+):
+    client.force_login(admin_user)
+
+    url = reverse("admin:tests_pet_changelist")
+    response = client.get(
+        url,
+        {"content_type__id__exact": ContentType.objects.get_for_model(Cat).pk},
+    )
+    assert response.status_code == 200
+    assert [
+        pet.content_type.model_class()
+        for pet in response.context["cl"].result_list
+    ] == [Cat, Cat]
+
+    # only the target models are offered
+    choices = [
+        choice["display"]
+        for choice in response.context["cl"]
+        .filter_specs[0]
+        .choices(response.context["cl"])
+    ]
+    assert choices == ["All", "Tests | Dog", "Tests | Cat"]
+
+
+def test_list_filter_must_be_generic_field():
+    from django.contrib.admin import site
+
+    class BadListFilterAdmin(GenericFKAdmin):
+        generic_list_filter = ("owner",)
+
+    with pytest.raises(ImproperlyConfigured) as ic:
+        BadListFilterAdmin(Pet, site)
+    assert ic.value.args[0] == (
+        "owner in generic_list_filter is not a GenericForeignKey on Pet"
+    )
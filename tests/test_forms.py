@@ -1,9 +1,10 @@
 import pytest
 from django.contrib.contenttypes.models import ContentType
 
-from genfkadmin import FIELD_ID_FORMAT
+from genfkadmin import CONTENT_TYPE_ID_FORMAT, FIELD_ID_FORMAT
 from genfkadmin.fields import GenericFKField
 from genfkadmin.forms import GenericFKModelForm
+from genfkadmin.targets import get_generic_targets
 from tests.models import Cat, Dog, Pet
 
 
@@ -52,6 +53,27 @@ def test_form_populates_initial_value(pets):
     ) == FIELD_ID_FORMAT.format(app_label="tests", model_name="dog", pk=dog.pk)
 
 
+@pytest.mark.django_db
+def test_form_initial_value_does_not_fetch_target(
+    pets, django_assert_num_queries
+):
+    class PetAdminForm(GenericFKModelForm):
+        class Meta:
+            model = Pet
+            fields = "__all__"
+
+    ContentType.objects.get_for_model(Dog)
+    instance = Pet.objects.get(pk=pets["pets"][0].pk)
+    form = PetAdminForm(instance=instance)
+    with django_assert_num_queries(0):
+        initial = form.get_initial_for_field(
+            form.fields["content_object_gfk"], "content_object_gfk"
+        )
+    assert initial == FIELD_ID_FORMAT.format(
+        app_label="tests", model_name="dog", pk=pets["dogs"][0].pk
+    )
+
+
 @pytest.mark.django_db
 def test_form_save_updates_content_type_and_fk_fields(pets):
     class PetAdminForm(GenericFKModelForm):
@@ -82,11 +104,13 @@ def test_form_save_updates_content_type_and_fk_fields(pets):
 
 
 @pytest.mark.django_db
-def test_form_filter(pets):
+def test_form_filter(pets, monkeypatch):
     instance = pets["pets"][0]
 
-    GenericFKModelForm.filter_callback = lambda queryset: queryset.filter(
-        tags__owner=instance.owner
+    monkeypatch.setattr(
+        GenericFKModelForm,
+        "filter_callback",
+        lambda queryset: queryset.filter(tags__owner=instance.owner),
     )
 
     class PetAdminForm(GenericFKModelForm):
@@ -114,3 +138,81 @@ def test_form_filter(pets):
     ]
 
     assert expected_choices == actual_choices
+
+
+@pytest.mark.django_db
+def test_form_class_definition_issues_no_queries(
+    pets, django_assert_num_queries
+):
+    with django_assert_num_queries(0):
+
+        class PetAdminForm(GenericFKModelForm):
+            class Meta:
+                model = Pet
+                fields = "__all__"
+
+        PetAdminForm(instance=pets["pets"][0]).fields
+
+
+@pytest.mark.django_db
+def test_forms_share_generic_field_choices(pets, django_assert_num_queries):
+    class PetAdminForm(GenericFKModelForm):
+        class Meta:
+            model = Pet
+            fields = "__all__"
+
+    form_class = PetAdminForm.with_generic_field_options()
+    forms = [form_class(instance=pet) for pet in pets["pets"][:3]]
+
+    # one query per target for every form rendered
+    with django_assert_num_queries(2):
+        for form in forms:
+            list(form.fields["content_object_gfk"].choices)
+
+
+@pytest.mark.django_db
+def test_form_save_with_content_type_ids_issues_no_queries(
+    pets, django_assert_num_queries
+):
+    class PetAdminForm(GenericFKModelForm):
+        class Meta:
+            model = Pet
+            fields = "__all__"
+
+    PetAdminForm.base_fields[
+        "content_object_gfk"
+    ].targets = get_generic_targets(Pet, value_format=CONTENT_TYPE_ID_FORMAT)
+    instance = pets["pets"][0]
+    cat = pets["cats"][0]
+    content_type = ContentType.objects.get_for_model(Cat)
+
+    assert PetAdminForm(instance=instance).get_initial_for_field(
+        None, "content_object_gfk"
+    ) == "%s:%s" % (
+        ContentType.objects.get_for_model(Dog).id,
+        pets["dogs"][0].pk,
+    )
+
+    form = PetAdminForm(
+        data={
+            "owner": instance.owner.pk,
+            "content_object_gfk": f"{content_type.id}:{cat.pk}",
+        },
+        instance=instance,
+    )
+    assert form.is_valid()
+    with django_assert_num_queries(0):
+        updated_instance = form.save(commit=False)
+    assert updated_instance.content_type == content_type
+    assert updated_instance.object_id == str(cat.pk)
+
+
+@pytest.mark.django_db
+def test_form_skips_excluded_generic_fields():
+    class PetAdminForm(GenericFKModelForm):
+        class Meta:
+            model = Pet
+            exclude = ["content_object_gfk"]
+
+    assert list(PetAdminForm.base_fields) == ["owner"]
+    assert PetAdminForm.generic_fields == {}
@@ -0,0 +1,44 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from genfkadmin.registry import GenericFKRegistry, registry
+from tests.models import Cat, Dog, GenreA, Pet
+
+
+def test_registry_populated_when_ready():
+    assert Pet in registry.metadata
+    assert "target_models" in registry.metadata[Pet].__dict__
+
+
+@pytest.mark.django_db
+def test_registry_populate_issues_no_queries(django_assert_num_queries):
+    with django_assert_num_queries(0):
+        GenericFKRegistry().populate()
+
+
+def test_registry_generic_fields():
+    metadata = registry.get(GenreA)
+
+    assert metadata.generic_fields == {
+        "media_gfk": {
+            "original_field_name": "media",
+            "ct_field": "ct",
+            "ct_attname": "ct_id",
+            "fk_field": "ob",
+            "label": "Media",
+            "help_text": "",
+        }
+    }
+    assert metadata.generic_related_fields == {"ct", "ob"}
+
+
+def test_registry_target_models():
+    assert registry.get(Pet).target_models == [Dog, Cat]
+
+
+@pytest.mark.django_db
+def test_registry_content_type_ids():
+    assert registry.get(Pet).content_type_ids == {
+        Dog: ContentType.objects.get_for_model(Dog).id,
+        Cat: ContentType.objects.get_for_model(Cat).id,
+    }
@@ -0,0 +1,203 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+
+from genfkadmin import CONTENT_TYPE_ID_FORMAT
+from genfkadmin.targets import (
+    GenericTarget,
+    get_generic_targets,
+    parse_target_content_type,
+)
+from tests.factories import EmailDeliveryMechanismFactory
+from tests.models import (
+    Cat,
+    Customer,
+    Dog,
+    EmailDeliveryMechanism,
+    MarketingMaterial,
+    Pet,
+    SMSDeliveryMechanism,
+)
+
+
+def test_get_generic_targets_defaults():
+    targets = get_generic_targets(Pet)
+    assert [target.model for target in targets] == [Dog, Cat]
+    assert [target.group_label for target in targets] == [
+        "Tests | Dog",
+        "Tests | Cat",
+    ]
+
+
+def test_get_generic_targets_options_by_label_or_model():
+    targets = get_generic_targets(
+        MarketingMaterial,
+        {
+            "tests.EmailDeliveryMechanism": {"search_fields": ["^value"]},
+            SMSDeliveryMechanism: {"ordering": ["-value"]},
+        },
+    )
+    assert targets[0].search_fields == ("^value",)
+    assert targets[1].ordering == ("-value",)
+
+
+def test_get_generic_targets_unrelated_model():
+    with pytest.raises(ImproperlyConfigured):
+        get_generic_targets(Pet, {"tests.Elephant": {}})
+
+
+def test_get_generic_targets_invalid_option():
+    with pytest.raises(ImproperlyConfigured):
+        get_generic_targets(Pet, {Dog: {"not_an_option": True}})
+
+
+@pytest.mark.parametrize(
+    "ordering", [["nickname"], ["-nickname"], ["tags__owner"], ["missing"]]
+)
+def test_get_generic_targets_nullable_ordering(ordering):
+    # candidates are paged by seeking past their ordering, which NULLs break
+    with pytest.raises(ImproperlyConfigured):
+        get_generic_targets(Pet, {Dog: {"ordering": ordering}})
+
+
+def test_get_generic_targets_ordering_across_relations():
+    targets = get_generic_targets(
+        MarketingMaterial,
+        {EmailDeliveryMechanism: {"ordering": ["-customer__name"]}},
+    )
+    assert targets[0].get_ordering() == ("-customer__name", "pk")
+
+
+def test_target_related_models():
+    target = GenericTarget(
+        EmailDeliveryMechanism,
+        label_fields=["value", "customer__name"],
+        select_related=["customer"],
+        only=["value", "customer__name"],
+    )
+    assert target.get_related_models() == [Customer]
+    assert GenericTarget(EmailDeliveryMechanism).get_related_models() == []
+
+
+def test_target_construct_search():
+    target = GenericTarget(EmailDeliveryMechanism)
+    assert target.construct_search("^value") == "value__istartswith"
+    assert target.construct_search("=value") == "value__iexact"
+    assert target.construct_search("value__startswith") == (
+        "value__startswith"
+    )
+    assert target.construct_search("customer__name") == (
+        "customer__name__icontains"
+    )
+
+
+@pytest.mark.django_db
+def test_target_search_and_ordering(marketing_materials):
+    EmailDeliveryMechanismFactory(
+        customer=marketing_materials["customer"]["c1"], value="b@acme.com"
+    )
+    EmailDeliveryMechanismFactory(
+        customer=marketing_materials["customer"]["c2"], value="a@acme.com"
+    )
+    target = GenericTarget(
+        EmailDeliveryMechanism,
+        search_fields=["value__endswith"],
+        ordering=["value"],
+    )
+    queryset = target.search(target.get_queryset(), "@acme.com")
+
+    assert [i.value for i in queryset] == ["a@acme.com", "b@acme.com"]
+    assert 'ORDER BY "tests_emaildeliverymechanism"."value" ASC' in str(
+        queryset.query
+    )
+
+
+@pytest.mark.django_db
+def test_target_label_fields(marketing_materials):
+    email = marketing_materials["email"]["e1"]
+    target = GenericTarget(
+        EmailDeliveryMechanism,
+        label_fields=["value", "customer__name"],
+        label_format="{value} ({customer__name})",
+    )
+    assert target.get_label(email) == f"{email.value} ({email.customer.name})"
+
+    target = GenericTarget(EmailDeliveryMechanism, label_fields=["value"])
+    assert target.get_label(email) == email.value
+
+
+@pytest.mark.django_db
+def test_target_seek_filter(marketing_materials):
+    target = GenericTarget(EmailDeliveryMechanism, ordering=["-value"])
+    emails = list(target.get_queryset())
+
+    key = (emails[1].value, emails[1].pk)
+    assert (
+        list(target.get_queryset().filter(target.get_seek_filter(key)))
+        == (emails[2:])
+    )
+
+
+@pytest.mark.django_db
+def test_target_queryset_hints(marketing_materials, django_assert_num_queries):
+    target = GenericTarget(
+        EmailDeliveryMechanism,
+        select_related=["customer"],
+        only=["value", "customer__name"],
+    )
+    # __str__ of a DeliveryMechanism uses its customer
+    with django_assert_num_queries(1):
+        labels = [target.get_label(i) for i in target.get_queryset()]
+
+    assert sorted(labels) == sorted(
+        str(email) for email in marketing_materials["email"].values()
+    )
+    assert target.get_queryset().query.deferred_loading == (
+        frozenset({"value", "customer__name"}),
+        False,
+    )
+
+
+@pytest.mark.django_db
+def test_target_queryset_prefetch_related(
+    marketing_materials, django_assert_num_queries
+):
+    target = GenericTarget(
+        EmailDeliveryMechanism, prefetch_related=["material"]
+    )
+    with django_assert_num_queries(2):
+        for email in target.get_queryset():
+            list(email.material.all())
+
+
+def test_target_label_expression():
+    target = GenericTarget(
+        EmailDeliveryMechanism,
+        label_fields=["value"],
+        label_format="{value} ({value!r})",
+    )
+    assert target.get_label_expression() is None
+    assert GenericTarget(EmailDeliveryMechanism).get_label_expression() is None
+    assert (
+        GenericTarget(
+            EmailDeliveryMechanism, label_fields=["value"]
+        ).get_label_expression()
+        is not None
+    )
+
+
+@pytest.mark.django_db
+def test_target_value_formats():
+    content_type = ContentType.objects.get_for_model(Dog)
+    target = GenericTarget(Dog, value_format=CONTENT_TYPE_ID_FORMAT)
+
+    assert target.get_value(3) == f"{content_type.id}:3"
+    assert GenericTarget(Dog).get_value(3) == "tests$dog[3]"
+
+    for value in (f"{content_type.id}:3", "tests$dog[3]"):
+        assert parse_target_content_type(value) == (content_type, "3")
+
+    with pytest.raises(ValueError):
+        parse_target_content_type("dog:3")
+    with pytest.raises(ContentType.DoesNotExist):
+        parse_target_content_type("tests$unknown[3]")
@@ -0,0 +1,37 @@
+import pytest
+from django import forms
+
+from genfkadmin.widgets import GenericFKSelect
+
+CHOICES = [
+    ("", "---------"),
+    (
+        "Tests | Dog",
+        [("tests$dog[1]", "Rex"), ("tests$dog[2]", "<b>Fido</b> & co")],
+    ),
+    ("Tests | Cat", [("tests$cat[1]", "Tom"), ("tests$cat[2]", 'The "Cat"')]),
+]
+
+
+@pytest.mark.parametrize(
+    "value", [None, "", "tests$dog[2]", "tests$cat[1]", "tests$cat[3]"]
+)
+def test_select_renders_like_django_select(value):
+    attrs = {"id": "id_content_object_gfk", "required": True}
+    expected = forms.Select(choices=CHOICES).render(
+        "content_object_gfk", value, attrs=attrs
+    )
+    actual = GenericFKSelect(choices=CHOICES).render(
+        "content_object_gfk", value, attrs=attrs
+    )
+    assert actual == expected
+
+
+def test_select_multiple_selected():
+    class GenericFKSelectMultiple(GenericFKSelect):
+        allow_multiple_selected = True
+
+    value = ["tests$dog[1]", "tests$cat[2]"]
+    expected = forms.SelectMultiple(choices=CHOICES).render("gfk", value)
+    actual = GenericFKSelectMultiple(choices=CHOICES).render("gfk", value)
+    assert actual == expected